@@ -5,6 +5,7 @@ A user-friendly GUI for manually placing defects on objects with drag-and-drop f
 
 import sys
 import os
+import re
 import json
 import numpy as np
 import cv2
@@ -12,30 +13,190 @@ from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QPushButton, QSlider, QComboBox, QListWidget, QGroupBox,
     QSplitter, QFileDialog, QMessageBox, QSpinBox, QCheckBox,
-    QGraphicsView, QGraphicsScene, QGraphicsPixmapItem, QGraphicsEllipseItem,
+    QGraphicsView, QGraphicsScene, QGraphicsItem, QGraphicsPixmapItem, QGraphicsEllipseItem,
     QGraphicsRectItem, QGraphicsPathItem, QListWidgetItem, QToolBar, QStatusBar, QDockWidget, QColorDialog,
     QScrollArea
 )
-from PyQt5.QtCore import Qt, QRectF, pyqtSignal, QPointF
+from PyQt5.QtCore import (
+    Qt, QRectF, pyqtSignal, QPointF, QObject, QTimer, QByteArray, QBuffer, QIODevice
+)
 from PyQt5.QtGui import QPixmap, QImage, QPainter, QBrush, QColor, QPen, QTransform, QCursor, QPainterPath
 import torch
-import torchvision.transforms as transforms
-import torchvision.transforms.functional as TF
+from torchvision.io import write_png
 from PIL import Image
 from typing import List, Tuple, Optional, Dict
 import random
+from operator import attrgetter
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+
+try:
+    from numba import njit
+except ImportError:  # Optional: apply_defect_to_image falls back to NumPy
+    njit = None
 
 # Note: These modules are not used in the current implementation
 # from dataset import MVTecDataset
 # from augmentation import CopyPasteAugmentation
 
+IMAGE_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg'})
+
+# Threads per background pool, kept small so the pools and torch do not oversubscribe the CPU
+WORKER_THREADS = min(4, os.cpu_count() or 1)
+# Library defects kept converted (prebuilt RGBA images and cropped tensors)
+DEFECT_CACHE_SIZE = 256
+
+# Smooth library defect renders shared by all items, keyed by (source, scale * 100, rotation)
+TRANSFORM_CACHE_SIZE = 64
+_transform_cache: "OrderedDict[Tuple, QPixmap]" = OrderedDict()
+
+
+if njit is not None:
+    # Serial: defect patches are small, so thread dispatch would cost more than it saves.
+    # cache=True keeps the compiled kernel on disk, so only the first run ever compiles it
+    @njit(cache=True)
+    def blend_uint8(img, def_rgb, mask, opacity_q8):
+        """Fused in-place version of the fixed-point blend in apply_defect_to_image (compiled on first use)"""
+        for y in range(img.shape[0]):
+            for x in range(img.shape[1]):
+                m = np.uint32(mask[y, x])
+                a = ((m + (m >> 7)) * opacity_q8) >> 8
+                if a:
+                    for c in range(3):
+                        img[y, x, c] = (img[y, x, c] * (256 - a) + def_rgb[y, x, c] * a) >> 8
+else:
+    blend_uint8 = None
+
+
+def file_version(path):
+    """(path, modification time) identifying the current contents of a file; mtime is None if unavailable"""
+    try:
+        return path, os.path.getmtime(path)
+    except (OSError, TypeError):
+        return path, None
+
+
+def cached_transform(source, pixmap, scale, rotation):
+    """Smoothly scale and rotate pixmap, reusing a recent render of the same source.
+    A source of None (item-specific pixmaps such as regions) is rendered without caching.
+    """
+    key = (source, round(scale * 100), round(rotation))
+    if source is not None:
+        transformed = _transform_cache.get(key)
+        if transformed is not None:
+            _transform_cache.move_to_end(key)
+            return transformed
+   
+    transform = QTransform()
+    transform.scale(scale, scale)
+    transform.rotate(rotation)
+    transformed = pixmap.transformed(transform, Qt.SmoothTransformation)
+    if source is not None:
+        _transform_cache[key] = transformed
+        if len(_transform_cache) > TRANSFORM_CACHE_SIZE:
+            _transform_cache.popitem(last=False)
+    return transformed
+
+
+def qimage_view(qimage, channels):
+    """Read-only HxWxC (HxW for one channel) uint8 view aliasing the QImage pixel buffer.
+    Row padding is skipped through strides; the view is only valid while qimage is alive.
+    """
+    ptr = qimage.constBits()
+    ptr.setsize(qimage.byteCount())
+    if channels == 1:
+        return np.ndarray((qimage.height(), qimage.width()), dtype=np.uint8, buffer=ptr,
+                          strides=(qimage.bytesPerLine(), 1))
+    return np.ndarray((qimage.height(), qimage.width(), channels), dtype=np.uint8, buffer=ptr,
+                      strides=(qimage.bytesPerLine(), channels, 1))
+
+
+def pixmap_to_rgba_arrays(pixmap):
+    """Split a pixmap into owned uint8 HxWx3 color and HxW alpha arrays (straight alpha)"""
+    # Keep the converted image alive while the view is copied out of it
+    image = pixmap.toImage().convertToFormat(QImage.Format_RGBA8888)
+    rgba = qimage_view(image, 4).copy()
+    return rgba[:, :, :3], rgba[:, :, 3]
+
+
+def uint8_to_tensor(arr):
+    """Convert an HxWx3 uint8 array to a CHW float32 tensor in [0, 1] with a single float pass"""
+    return torch.from_numpy(arr).permute(2, 0, 1).contiguous().to(torch.float32).mul_(1.0 / 255.0)
+
+
+def pil_to_tensor(image):
+    """Convert an RGB PIL image to a CHW float32 tensor in [0, 1] with a single float pass"""
+    return uint8_to_tensor(np.array(image))
+
+
+def pixmap_to_png_bytes(pixmap):
+    """Encode a pixmap as PNG bytes (compact for sparse layers such as paint strokes)"""
+    byte_array = QByteArray()
+    buffer = QBuffer(byte_array)
+    buffer.open(QIODevice.WriteOnly)
+    pixmap.save(buffer, "PNG")
+    buffer.close()
+    return bytes(byte_array)
+
+
+def png_bytes_to_pixmap(data):
+    """Decode PNG bytes produced by pixmap_to_png_bytes"""
+    pixmap = QPixmap()
+    pixmap.loadFromData(data, "PNG")
+    return pixmap
+
+
+def pixmap_has_content(pixmap):
+    """Check whether any pixel of the pixmap is not fully transparent"""
+    image = pixmap.toImage().convertToFormat(QImage.Format_RGBA8888)
+    return bool(qimage_view(image, 4)[:, :, 3].any())
+
+
+def largest_contour(mask):
+    """Bounding box (x, y, w, h) and (N, 2) points of the largest external contour of a uint8 mask, or None"""
+    _, binary_mask = cv2.threshold(np.ascontiguousarray(mask), 127, 255, cv2.THRESH_BINARY)
+    contours, _ = cv2.findContours(binary_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    contour = max(contours, key=cv2.contourArea)
+    return cv2.boundingRect(contour), contour.reshape(-1, 2)
+
+
+def contour_metadata(contour, position):
+    """bbox and COCO segmentation of an item-local contour placed at position"""
+    (x, y, w, h), points = contour
+    item_x, item_y = position
+    return {
+        'bbox': [item_x + x, item_y + y, w, h],
+        'segmentation': [(points + np.array([item_x, item_y])).tolist()]  # COCO format: list of polygons
+    }
+
+
+def tensor_to_qimage(image_tensor):
+    """Convert a CHW float tensor in [0, 1] to an RGB888 QImage that owns its pixels.
+    Only QImage is used, so this is safe to call off the GUI thread.
+    """
+    image_np = image_tensor.mul(255).clamp_(0, 255).byte().permute(1, 2, 0).contiguous().numpy()
+    h, w, c = image_np.shape
+    return QImage(image_np.data, w, h, w * c, QImage.Format_RGB888).copy()
+
+
+def defect_to_rgba_qimage(defect_tensor, mask_tensor):
+    """Convert a cropped defect and its mask to an RGBA8888 QImage (mask as alpha) that owns its pixels.
+    Only QImage is used, so this is safe to call off the GUI thread.
+    """
+    h, w = defect_tensor.shape[1], defect_tensor.shape[2]
+    rgba_np = np.empty((h, w, 4), dtype=np.uint8)
+    rgba_np[:, :, :3] = defect_tensor.mul(255).clamp_(0, 255).byte().permute(1, 2, 0).numpy()
+    rgba_np[:, :, 3] = mask_tensor.squeeze(0).mul(255).clamp_(0, 255).byte().numpy()
+    return QImage(rgba_np.data, w, h, w * 4, QImage.Format_RGBA8888).copy()
+
 
 class DefectItem(QGraphicsPixmapItem):
     """Draggable defect item on the canvas"""
    
-    def __init__(self, pixmap, mask_pixmap, defect_data, exclude_masks=False, parent=None):
+    def __init__(self, pixmap, defect_data, exclude_masks=False, parent=None):
         super().__init__(pixmap)
-        self.mask_pixmap = mask_pixmap
         self.defect_data = defect_data
         self.exclude_masks = exclude_masks  # Store the exclude_masks state when created
         self.setFlags(
@@ -44,42 +205,93 @@ class DefectItem(QGraphicsPixmapItem):
             QGraphicsPixmapItem.ItemSendsGeometryChanges
         )
         self.setZValue(1)  # Above background
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)  # Blit cached rendering on pan/drag
         self.original_pixmap = pixmap
-        self.original_mask = mask_pixmap
         self.scale_factor = 1.0
         self.rotation_angle = 0
         self.opacity = 0.7
-       
-    def update_transform(self, scale, rotation, opacity):
-        """Update defect transformation"""
+        self.is_smooth = True  # False while showing a fast interactive transform
+        # Same library defect renders identically, so items placed from it share cached transforms;
+        # file versions keep renders of an edited file from being reused
+        if defect_data.get('mask_path'):
+            self.cache_source = (file_version(defect_data['mask_path']), file_version(defect_data.get('defect_image_path')))
+        else:
+            self.cache_source = None
+        self.pixel_arrays = None  # (pixmap cacheKey, rgb, alpha) of the current pixmap
+        self.contour_cache = None  # (pixmap cacheKey, largest mask contour) of the current pixmap
+       
+    def update_transform(self, scale, rotation, opacity, interactive=False):
+        """Update defect transformation.
+        While interactive (slider being dragged) a fast nearest-neighbour transform is used;
+        call again with interactive=False to re-render smoothly.
+        """
+        geometry_unchanged = scale == self.scale_factor and rotation == self.rotation_angle
         self.scale_factor = scale
         self.rotation_angle = rotation
         self.opacity = opacity
        
-        # Apply transformations
-        transform = QTransform()
-        transform.scale(scale, scale)
-        transform.rotate(rotation)
+        # Only opacity changed: keep the current pixmaps
+        if geometry_unchanged and (interactive or self.is_smooth):
+            self.setOpacity(opacity)
+            return
        
-        # Apply to pixmap (preserve RGBA format)
-        transformed_pixmap = self.original_pixmap.transformed(transform, Qt.SmoothTransformation)
-        transformed_mask = self.original_mask.transformed(transform, Qt.SmoothTransformation)
+        # Apply to pixmap (preserve RGBA format), smooth renders go through the shared cache
+        if interactive:
+            transform = QTransform()
+            transform.scale(scale, scale)
+            transform.rotate(rotation)
+            transformed_pixmap = self.original_pixmap.transformed(transform, Qt.FastTransformation)
+        else:
+            transformed_pixmap = cached_transform(self.cache_source, self.original_pixmap, scale, rotation)
        
         self.setPixmap(transformed_pixmap)
-        self.mask_pixmap = transformed_mask
+        self.is_smooth = not interactive
         self.setOpacity(opacity)
        
+    def get_pixel_arrays(self):
+        """uint8 color and alpha arrays of the current pixmap, cached until the pixmap changes"""
+        key = self.pixmap().cacheKey()
+        if self.pixel_arrays is None or self.pixel_arrays[0] != key:
+            self.pixel_arrays = (key,) + pixmap_to_rgba_arrays(self.pixmap())
+        return self.pixel_arrays[1], self.pixel_arrays[2]
+       
+    def get_contour(self):
+        """Largest mask contour in item coordinates, cached until the pixmap changes"""
+        key = self.pixmap().cacheKey()
+        if self.contour_cache is None or self.contour_cache[0] != key:
+            _, alpha = self.get_pixel_arrays()
+            self.contour_cache = (key, largest_contour(alpha))
+        return self.contour_cache[1]
+       
     def get_position(self):
         """Get current position"""
         return self.pos().x(), self.pos().y()
+       
+    def to_metadata_dict(self):
+        """Export metadata of the defect at its current position and transform"""
+        position = self.get_position()
+        meta = {
+            'label': self.defect_data.get('type', 'unknown'),
+            'position': position,
+            'scale': self.scale_factor,
+            'rotation': self.rotation_angle,
+            'opacity': self.opacity,
+            'mask_path': self.defect_data.get('mask_path') if not self.exclude_masks else None,
+            'defect_image_path': self.defect_data.get('defect_image_path') if not self.exclude_masks else None
+        }
+        # Segmentation from the mask if not excluded
+        if not self.exclude_masks:
+            contour = self.get_contour()
+            if contour is not None:
+                meta.update(contour_metadata(contour, position))
+        return meta
 
 
 class SelectedRegionItem(QGraphicsPixmapItem):
     """Draggable selected region item on the canvas"""
    
-    def __init__(self, pixmap, mask_pixmap, region_data, exclude_masks=False, parent=None):
+    def __init__(self, pixmap, region_data, exclude_masks=False, parent=None):
         super().__init__(pixmap)
-        self.mask_pixmap = mask_pixmap
         self.region_data = region_data
         self.exclude_masks = exclude_masks  # Store the exclude_masks state when created
         self.setFlags(
@@ -88,34 +300,110 @@ class SelectedRegionItem(QGraphicsPixmapItem):
             QGraphicsPixmapItem.ItemSendsGeometryChanges
         )
         self.setZValue(2)  # Above defects
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)  # Blit cached rendering on pan/drag
         self.original_pixmap = pixmap
-        self.original_mask = mask_pixmap
         self.scale_factor = 1.0
         self.rotation_angle = 0
         self.opacity = 0.8
-       
-    def update_transform(self, scale, rotation, opacity):
-        """Update region transformation"""
+        self.is_smooth = True  # False while showing a fast interactive transform
+        self.cache_source = None  # Regions are unique crops, so their transforms are not shared
+        self.pixel_arrays = None  # (pixmap cacheKey, rgb, alpha) of the current pixmap
+        self.contour_cache = None  # (pixmap cacheKey, largest mask contour) of the current pixmap
+       
+    def update_transform(self, scale, rotation, opacity, interactive=False):
+        """Update region transformation.
+        While interactive (slider being dragged) a fast nearest-neighbour transform is used;
+        call again with interactive=False to re-render smoothly.
+        """
+        geometry_unchanged = scale == self.scale_factor and rotation == self.rotation_angle
         self.scale_factor = scale
         self.rotation_angle = rotation
         self.opacity = opacity
        
-        # Apply transformations
-        transform = QTransform()
-        transform.scale(scale, scale)
-        transform.rotate(rotation)
+        # Only opacity changed: keep the current pixmaps
+        if geometry_unchanged and (interactive or self.is_smooth):
+            self.setOpacity(opacity)
+            return
        
-        # Apply to pixmap (preserve RGBA format)
-        transformed_pixmap = self.original_pixmap.transformed(transform, Qt.SmoothTransformation)
-        transformed_mask = self.original_mask.transformed(transform, Qt.SmoothTransformation)
+        # Apply to pixmap (preserve RGBA format); region renders are per item, not cached
+        if interactive:
+            transform = QTransform()
+            transform.scale(scale, scale)
+            transform.rotate(rotation)
+            transformed_pixmap = self.original_pixmap.transformed(transform, Qt.FastTransformation)
+        else:
+            transformed_pixmap = cached_transform(self.cache_source, self.original_pixmap, scale, rotation)
        
         self.setPixmap(transformed_pixmap)
-        self.mask_pixmap = transformed_mask
+        self.is_smooth = not interactive
         self.setOpacity(opacity)
        
+    def get_pixel_arrays(self):
+        """uint8 color and alpha arrays of the current pixmap, cached until the pixmap changes"""
+        key = self.pixmap().cacheKey()
+        if self.pixel_arrays is None or self.pixel_arrays[0] != key:
+            self.pixel_arrays = (key,) + pixmap_to_rgba_arrays(self.pixmap())
+        return self.pixel_arrays[1], self.pixel_arrays[2]
+       
+    def get_contour(self):
+        """Largest mask contour in item coordinates, cached until the pixmap changes"""
+        key = self.pixmap().cacheKey()
+        if self.contour_cache is None or self.contour_cache[0] != key:
+            _, alpha = self.get_pixel_arrays()
+            self.contour_cache = (key, largest_contour(alpha))
+        return self.contour_cache[1]
+       
     def get_position(self):
         """Get current position"""
         return self.pos().x(), self.pos().y()
+       
+    def to_metadata_dict(self):
+        """Export metadata of the region at its current position and transform"""
+        position = self.get_position()
+        meta = {
+            'label': 'selection_label',
+            'position': position,
+            'scale': self.scale_factor,
+            'rotation': self.rotation_angle,
+            'opacity': self.opacity,
+            'original_rect': self.region_data.get('original_rect') if not self.exclude_masks else None,
+            'source': self.region_data.get('source', 'unknown') if not self.exclude_masks else None
+        }
+        # Segmentation from the mask if not excluded
+        if not self.exclude_masks:
+            contour = self.get_contour()
+            if contour is not None:
+                meta.update(contour_metadata(contour, position))
+        return meta
+
+
+class PaintLayerItem(QGraphicsItem):
+    """Paint layer drawn straight from the canvas pixmap.
+    It references the pixmap object instead of holding a shared copy, so brush strokes
+    painted into it in place only need update(rect) rather than a full setPixmap().
+    """
+   
+    def __init__(self, pixmap, parent=None):
+        super().__init__(parent)
+        self.layer = pixmap
+       
+    def setPixmap(self, pixmap):
+        """Replace the displayed layer"""
+        self.prepareGeometryChange()
+        self.layer = pixmap
+        self.update()
+       
+    def pixmap(self):
+        """Get the displayed layer"""
+        return self.layer
+       
+    def boundingRect(self):
+        """Bounds of the displayed layer"""
+        return QRectF(self.layer.rect())
+       
+    def paint(self, painter, option, widget=None):
+        """Draw the layer at the item origin"""
+        painter.drawPixmap(0, 0, self.layer)
 
 
 class InteractiveCanvas(QGraphicsView):
@@ -136,10 +424,15 @@ class InteractiveCanvas(QGraphicsView):
         self.background_item = None
         self.background_tensor = None
         self.original_background_tensor = None  # Store original size image
+        self.background_uint8 = None  # HxWx3 uint8 view of the displayed background
+        self.background_qimage = None  # Keeps the pixels behind background_uint8 alive
+        self._scratch_color = None  # Reused get_augmented_arrays buffers (HxWx3 and HxW uint8)
+        self._scratch_mask = None
        
         # Defect items
         self.defect_items = []
         self.selected_defect = None
+        self._rgba_cache: Dict[Tuple[int, int], np.ndarray] = {}  # Scratch RGBA buffers keyed by (h, w)
        
         # Selected region items
         self.region_items = []
@@ -156,7 +449,8 @@ class InteractiveCanvas(QGraphicsView):
        
         # Freehand selection
         self.freehand_path = None
-        self.freehand_points = []
+        self.freehand_points = np.empty((0, 2), dtype=np.float32)  # Scene points, first freehand_count rows used
+        self.freehand_count = 0
         self.freehand_item = None
        
         # Paint brush settings
@@ -165,54 +459,91 @@ class InteractiveCanvas(QGraphicsView):
         self.brush_size = 10
         self.brush_opacity = 100
         self.brush_color = QColor(0, 0, 0)  # Black by default
+        self._eraser_cursor_cache: Dict[int, QCursor] = {}  # Eraser cursors keyed by clamped size
         self.is_painting = False
         self.last_paint_point = None
+        self.paint_changed_pending = False  # A coalesced paint_changed emission is scheduled
        
         # Paint layer for brush strokes
         self.paint_layer = None
+        self.paint_layer_dirty = False  # Set once the brush may have left content on paint_layer
         self.paint_layer_item = None
        
         # Settings
         self.setDragMode(QGraphicsView.RubberBandDrag)
         self.setRenderHint(QPainter.Antialiasing)
+        # Repaint the whole viewport instead of tracking per-item dirty regions while dragging/painting
+        self.setViewportUpdateMode(QGraphicsView.FullViewportUpdate)
+        self.setOptimizationFlag(QGraphicsView.DontAdjustForAntialiasing, True)
        
         # [Removed] Object mask functionality
        
-    def set_background_image(self, image_tensor, original_tensor=None):
-        """Set the background image"""
+    def set_background_image(self, image_tensor, original_tensor=None, qimage=None):
+        """Set the background image.
+        Optionally provide the QImage already built from image_tensor (e.g. by a worker thread).
+        """
         self.background_tensor = image_tensor
         self.original_background_tensor = original_tensor if original_tensor is not None else image_tensor
        
-        # Convert tensor to QPixmap
-        image_np = image_tensor.permute(1, 2, 0).numpy()
-        image_np = (image_np * 255).astype(np.uint8)
-        h, w, c = image_np.shape
-       
-        qimage = QImage(image_np.tobytes(), w, h, w * c, QImage.Format_RGB888)
-        pixmap = QPixmap.fromImage(qimage)
-       
-        # Clear scene
-        self.scene.clear()
+        if qimage is None:
+            # Convert tensor to QPixmap (one uint8 pass, materialized as contiguous HWC once)
+            image_np = image_tensor.mul(255).clamp_(0, 255).byte().permute(1, 2, 0).contiguous().numpy()
+            h, w, c = image_np.shape
+           
+            # QImage wraps image_np without copying; both are kept alive below with the pixmap
+            qimage = QImage(image_np.data, w, h, w * c, QImage.Format_RGB888)
+        else:
+            # Alias the pixels of the prebuilt QImage (kept alive below)
+            image_np = qimage_view(qimage, 3)
+        # uint8 background used as the base of get_augmented_arrays compositing
+        self.background_uint8 = image_np
+        self.background_qimage = qimage
+        # Keep RGB888 as is: the background is drawn through the item's device cache,
+        # so the implicit conversion to the native format would not pay off. The pixmap
+        # may share the buffer of qimage, which is why both are held on the canvas
+        pixmap = QPixmap.fromImage(qimage, Qt.NoFormatConversion)
+       
+        # Clear scene items individually, the background and paint layer items are reused
+        for item in self.defect_items + self.region_items + [self.selection_item, self.freehand_item]:
+            if item is not None:
+                self.scene.removeItem(item)
         self.defect_items.clear()
         self.region_items.clear()
-        self.background_item = None
+        self.selection_item = None
+        self.freehand_item = None
         self.selected_defect = None
         self.selected_region = None
         self.current_selection = None
        
-        # Add background
-        self.background_item = self.scene.addPixmap(pixmap)
-        self.background_item.setZValue(0)
+        # Add background (rendered once per view scale and then blitted from Qt's device cache)
+        if self.background_item is None:
+            self.background_item = self.scene.addPixmap(pixmap)
+            self.background_item.setZValue(0)
+            self.background_item.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+        else:
+            self.background_item.setPixmap(pixmap)
        
-        # Create paint layer
-        self.paint_layer = QPixmap(pixmap.size())
+        # Create paint layer, only reallocated when the image size changes
+        if self.paint_layer is None or self.paint_layer.size() != pixmap.size():
+            self.paint_layer = QPixmap(pixmap.size())
         self.paint_layer.fill(Qt.transparent)
-        self.paint_layer_item = self.scene.addPixmap(self.paint_layer)
-        self.paint_layer_item.setZValue(1)  # Above background, below defects
+        self.paint_layer_dirty = False
+        if self.paint_layer_item is None:
+            self.paint_layer_item = PaintLayerItem(self.paint_layer)
+            self.scene.addItem(self.paint_layer_item)
+            self.paint_layer_item.setZValue(1)  # Above background, below defects
+        else:
+            self.paint_layer_item.setPixmap(self.paint_layer)
        
         # Fit in view
         self.fitInView(self.scene.itemsBoundingRect(), Qt.KeepAspectRatio)
        
+    def resizeEvent(self, event):
+        """Keep the background fitted to the view; its cached rendering is only redone here"""
+        super().resizeEvent(event)
+        if self.background_item:
+            self.fitInView(self.scene.itemsBoundingRect(), Qt.KeepAspectRatio)
+       
     # [Removed] Object mask overlay methods
            
     def add_defect(self, defect_tensor, mask_tensor, defect_info, position: Optional[Tuple[int, int]] = None, opacity_override: Optional[float] = None, exclude_masks: bool = False):
@@ -220,27 +551,34 @@ class InteractiveCanvas(QGraphicsView):
         Optionally provide a top-left position (x,y) and opacity to place without recentering.
         """
         # Convert defect tensor to QPixmap with transparency
-        defect_np = defect_tensor.permute(1, 2, 0).numpy()
-        defect_np = (defect_np * 255).astype(np.uint8)
-        mask_np = mask_tensor.squeeze(0).numpy()
-        mask_np = (mask_np * 255).astype(np.uint8)
+        defect_np = defect_tensor.mul(255).clamp_(0, 255).byte().permute(1, 2, 0).contiguous().numpy()
+        mask_np = mask_tensor.squeeze(0).mul(255).clamp_(0, 255).byte().numpy()
        
         h, w, c = defect_np.shape
        
-        # Create RGBA image with transparency
-        rgba_np = np.zeros((h, w, 4), dtype=np.uint8)
+        # Create RGBA image with transparency in a reusable buffer
+        rgba_np = self._rgba_cache.get((h, w))
+        if rgba_np is None:
+            if len(self._rgba_cache) >= 16:
+                self._rgba_cache.clear()
+            rgba_np = np.empty((h, w, 4), dtype=np.uint8)
+            self._rgba_cache[(h, w)] = rgba_np
         rgba_np[:, :, :3] = defect_np  # RGB channels
         rgba_np[:, :, 3] = mask_np     # Alpha channel from mask
        
-        qimage = QImage(rgba_np.tobytes(), w, h, w * 4, QImage.Format_RGBA8888)
-        pixmap = QPixmap.fromImage(qimage)
+        # add_defect_image() copies the pixels, so the buffer is free for the next defect
+        qimage = QImage(rgba_np.data, w, h, w * 4, QImage.Format_RGBA8888)
+        self.add_defect_image(qimage, defect_info, position, opacity_override, exclude_masks)
        
-        # Convert mask to pixmap (for internal use)
-        mask_qimage = QImage(mask_np.tobytes(), w, h, w, QImage.Format_Grayscale8)
-        mask_pixmap = QPixmap.fromImage(mask_qimage)
+    def add_defect_image(self, qimage, defect_info, position: Optional[Tuple[int, int]] = None, opacity_override: Optional[float] = None, exclude_masks: bool = False):
+        """Add a defect from an RGBA QImage whose alpha channel is the defect mask.
+        Optionally provide a top-left position (x,y) and opacity to place without recentering.
+        """
+        pixmap = QPixmap.fromImage(qimage)
+        w, h = pixmap.width(), pixmap.height()
        
-        # Create defect item
-        defect_item = DefectItem(pixmap, mask_pixmap, defect_info, exclude_masks)
+        # Create defect item (its mask is the pixmap alpha channel)
+        defect_item = DefectItem(pixmap, defect_info, exclude_masks)
        
         # Position
         if position is not None:
@@ -358,6 +696,8 @@ class InteractiveCanvas(QGraphicsView):
         elif self.brush_enabled and event.button() == Qt.LeftButton:
             self.is_painting = False
             self.last_paint_point = None
+            # Deliver the stroke's final change right away
+            self.emit_paint_changed()
         else:
             super().mouseReleaseEvent(event)
    
@@ -407,12 +747,13 @@ class InteractiveCanvas(QGraphicsView):
             painter.drawEllipse(x - radius, y - radius, self.brush_size, self.brush_size)
        
         painter.end()
+        self.paint_layer_dirty = True
        
-        # Update the paint layer item
-        self.paint_layer_item.setPixmap(self.paint_layer)
+        # Repaint only the touched area of the paint layer item
+        self.paint_layer_item.update(QRectF(x - radius - 2, y - radius - 2, self.brush_size + 4, self.brush_size + 4))
        
-        # Emit signal to mark changes as unsaved
-        self.paint_changed.emit()
+        # Signal (coalesced) to mark changes as unsaved
+        self.schedule_paint_changed()
    
     def paint_line(self, start_point, end_point):
         """Paint a line between two points"""
@@ -443,18 +784,34 @@ class InteractiveCanvas(QGraphicsView):
             painter.drawLine(start_x, start_y, end_x, end_y)
        
         painter.end()
+        self.paint_layer_dirty = True
        
-        # Update the paint layer item
-        self.paint_layer_item.setPixmap(self.paint_layer)
+        # Repaint only the touched area of the paint layer item
+        pad = self.brush_size / 2 + 2
+        dirty_rect = QRectF(QPointF(start_x, start_y), QPointF(end_x, end_y)).normalized()
+        self.paint_layer_item.update(dirty_rect.adjusted(-pad, -pad, pad, pad))
        
-        # Emit signal to mark changes as unsaved
-        self.paint_changed.emit()
+        # Signal (coalesced) to mark changes as unsaved
+        self.schedule_paint_changed()
+   
+    def schedule_paint_changed(self):
+        """Emit paint_changed at most once per frame (~16 ms) while a stroke is in progress"""
+        if not self.paint_changed_pending:
+            self.paint_changed_pending = True
+            QTimer.singleShot(16, self.emit_paint_changed)
+   
+    def emit_paint_changed(self):
+        """Emit a pending paint_changed signal, if any"""
+        if self.paint_changed_pending:
+            self.paint_changed_pending = False
+            self.paint_changed.emit()
    
     def clear_paint_layer(self):
         """Clear the paint layer"""
         if self.paint_layer:
             self.paint_layer.fill(Qt.transparent)
             self.paint_layer_item.setPixmap(self.paint_layer)
+        self.paint_layer_dirty = False
    
     def start_rectangle_selection(self):
         """Start rectangle selection"""
@@ -467,10 +824,20 @@ class InteractiveCanvas(QGraphicsView):
         if self.freehand_item:
             self.scene.removeItem(self.freehand_item)
         self.freehand_item = None
-        self.freehand_points = []
+        self.freehand_points = np.empty((256, 2), dtype=np.float32)
+        self.freehand_count = 0
         self.freehand_path = QPainterPath()
         self.freehand_path.moveTo(self.selection_start)
-        self.freehand_points.append(self.selection_start)
+        self.append_freehand_point(self.selection_start)
+   
+    def append_freehand_point(self, point):
+        """Record a freehand point, growing the preallocated buffer in chunks when full"""
+        if self.freehand_count == len(self.freehand_points):
+            grown = np.empty((max(256, 2 * len(self.freehand_points)), 2), dtype=np.float32)
+            grown[:self.freehand_count] = self.freehand_points[:self.freehand_count]
+            self.freehand_points = grown
+        self.freehand_points[self.freehand_count] = (point.x(), point.y())
+        self.freehand_count += 1
    
     def update_rectangle_selection(self, current_point):
         """Update rectangle selection during drag"""
@@ -480,11 +847,12 @@ class InteractiveCanvas(QGraphicsView):
         # Create rectangle from start to current point
         rect = QRectF(self.selection_start, current_point).normalized()
        
-        # Remove previous selection rectangle
+        # Reuse the selection rectangle for the rest of the drag
         if self.selection_item:
-            self.scene.removeItem(self.selection_item)
+            self.selection_item.setRect(rect)
+            return
        
-        # Create new selection rectangle with better visual feedback
+        # Create selection rectangle with better visual feedback
         self.selection_item = QGraphicsRectItem(rect)
         self.selection_item.setPen(QPen(QColor(0, 255, 0), 1, Qt.SolidLine))  # Green solid line - thinner
         self.selection_item.setBrush(QBrush(QColor(0, 255, 0, 30)))  # Light green fill
@@ -498,13 +866,14 @@ class InteractiveCanvas(QGraphicsView):
            
         # Add line to current point
         self.freehand_path.lineTo(current_point)
-        self.freehand_points.append(current_point)
+        self.append_freehand_point(current_point)
        
-        # Remove previous freehand path
+        # Reuse the freehand path item for the rest of the drag
         if self.freehand_item:
-            self.scene.removeItem(self.freehand_item)
+            self.freehand_item.setPath(self.freehand_path)
+            return
        
-        # Create new freehand path item
+        # Create freehand path item
         self.freehand_item = QGraphicsPathItem(self.freehand_path)
         self.freehand_item.setPen(QPen(QColor(0, 255, 0), 1, Qt.SolidLine))  # Green solid line - thinner
         self.freehand_item.setBrush(QBrush(QColor(0, 255, 0, 30)))  # Light green fill
@@ -548,7 +917,7 @@ class InteractiveCanvas(QGraphicsView):
    
     def finish_freehand_selection(self):
         """Finish freehand selection and automatically create draggable region"""
-        if not self.freehand_item or not self.background_item or len(self.freehand_points) < 3:
+        if not self.freehand_item or not self.background_item or self.freehand_count < 3:
             # Clean up if selection is too small
             if self.freehand_item:
                 self.scene.removeItem(self.freehand_item)
@@ -591,10 +960,6 @@ class InteractiveCanvas(QGraphicsView):
         # Extract the selected region from the background image
         region_pixmap = self.background_item.pixmap().copy(x, y, w, h)
        
-        # Create a mask for the region (fully opaque)
-        mask_pixmap = QPixmap(w, h)
-        mask_pixmap.fill(Qt.white)
-       
         # Create region data
         region_data = {
             'type': 'selected_region',
@@ -603,7 +968,7 @@ class InteractiveCanvas(QGraphicsView):
         }
        
         # Create region item
-        region_item = SelectedRegionItem(region_pixmap, mask_pixmap, region_data, exclude_masks)
+        region_item = SelectedRegionItem(region_pixmap, region_data, exclude_masks)
        
         # Position at center of canvas
         canvas_center_x = bg_rect.width() / 2 - w / 2
@@ -621,77 +986,47 @@ class InteractiveCanvas(QGraphicsView):
             'position': (region_item.x(), region_item.y())
         })
    
-    def create_region_from_freehand_selection(self, x, y, w, h, bg_rect, exclude_masks=False):
-        """Create a draggable region from freehand selection"""
+    def freehand_region_pixmap(self, x, y, w, h, points):
+        """Cut the (x, y, w, h) background rect, masked by the (N, 2) polygon points in background coordinates"""
         # Extract the background region
         background_region = self.background_item.pixmap().copy(x, y, w, h)
        
-        # Create a mask based on the freehand path
-        mask_pixmap = QPixmap(w, h)
-        mask_pixmap.fill(Qt.transparent)
-       
-        # Create painter for mask
-        mask_painter = QPainter(mask_pixmap)
-        mask_painter.setRenderHint(QPainter.Antialiasing)
-       
-        # Create a path relative to the region coordinates
-        relative_path = QPainterPath()
-        if self.freehand_points:
-            # Convert absolute coordinates to relative coordinates
-            first_point = self.freehand_points[0]
-            relative_x = first_point.x() - bg_rect.x() - x
-            relative_y = first_point.y() - bg_rect.y() - y
-            relative_path.moveTo(relative_x, relative_y)
-           
-            for point in self.freehand_points[1:]:
-                rel_x = point.x() - bg_rect.x() - x
-                rel_y = point.y() - bg_rect.y() - y
-                relative_path.lineTo(rel_x, rel_y)
-       
-        # Close the path to create a filled shape
-        relative_path.closeSubpath()
-       
-        # Fill the mask path with white (opaque)
-        mask_painter.fillPath(relative_path, QColor(255, 255, 255))
-        mask_painter.end()
-       
-        # Convert mask to numpy array for processing
-        mask_image = mask_pixmap.toImage()
+        # Rasterize the polygon (relative to the region) straight into the mask array
+        relative_points = (points - np.array([x, y])).astype(np.int32)
         mask_np = np.zeros((h, w), dtype=np.uint8)
-        for y in range(h):
-            for x in range(w):
-                pixel = mask_image.pixel(x, y)
-                mask_np[y, x] = (pixel >> 24) & 0xFF  # Get alpha channel
-       
-        # Convert background to numpy array
-        bg_image = background_region.toImage()
-        bg_np = np.zeros((h, w, 3), dtype=np.uint8)
-        for y in range(h):
-            for x in range(w):
-                pixel = bg_image.pixel(x, y)
-                bg_np[y, x, 0] = (pixel >> 16) & 0xFF  # Red
-                bg_np[y, x, 1] = (pixel >> 8) & 0xFF   # Green
-                bg_np[y, x, 2] = pixel & 0xFF          # Blue
-       
-        # Create RGBA image with transparency
-        rgba_np = np.zeros((h, w, 4), dtype=np.uint8)
-        rgba_np[:, :, :3] = bg_np  # RGB channels
-        rgba_np[:, :, 3] = mask_np  # Alpha channel from mask
+        cv2.fillPoly(mask_np, [relative_points], 255, lineType=cv2.LINE_AA)
+       
+        # Convert background to an RGBA numpy array (Qt fills alpha with 255)
+        bg_image = background_region.toImage().convertToFormat(QImage.Format_RGBA8888)
+        rgba_np = qimage_view(bg_image, 4).copy()
+       
+        # Only the alpha plane needs rewriting to apply the mask
+        rgba_np[:, :, 3] = mask_np
        
         # Convert back to QPixmap
-        qimage = QImage(rgba_np.tobytes(), w, h, w * 4, QImage.Format_RGBA8888)
-        region_pixmap = QPixmap.fromImage(qimage)
+        qimage = QImage(rgba_np.data, w, h, w * 4, QImage.Format_RGBA8888)
+        return QPixmap.fromImage(qimage)
+   
+    def create_region_from_freehand_selection(self, x, y, w, h, bg_rect, exclude_masks=False):
+        """Create a draggable region from freehand selection"""
+        # Convert the freehand points to background coordinates once and simplify the
+        # polyline (Ramer-Douglas-Peucker, 1px tolerance) before rasterizing it
+        points = self.freehand_points[:self.freehand_count] - np.float32([bg_rect.x(), bg_rect.y()])
+        points = cv2.approxPolyDP(points.reshape(-1, 1, 2), 1.0, True).reshape(-1, 2)
+        points = np.round(points).astype(np.int16)  # Compact (N, 2) polygon
+       
+        region_pixmap = self.freehand_region_pixmap(x, y, w, h, points)
        
         # Create region data
         region_data = {
             'type': 'freehand_region',
             'source': f'freehand_region_{len(self.region_items)}',
             'original_rect': (x, y, w, h),
-            'freehand_points': [(p.x() - bg_rect.x(), p.y() - bg_rect.y()) for p in self.freehand_points]
+            'freehand_points': points
         }
        
         # Create region item
-        region_item = SelectedRegionItem(region_pixmap, mask_pixmap, region_data, exclude_masks)
+        region_item = SelectedRegionItem(region_pixmap, region_data, exclude_masks)
        
         # Position at center of canvas
         canvas_center_x = bg_rect.width() / 2 - w / 2
@@ -705,7 +1040,7 @@ class InteractiveCanvas(QGraphicsView):
        
         # Clear freehand data
         self.freehand_path = None
-        self.freehand_points = []
+        self.freehand_count = 0
        
         # Emit signal
         self.region_placed.emit({
@@ -737,7 +1072,7 @@ class InteractiveCanvas(QGraphicsView):
             self.freehand_item = None
         self.current_selection = None
         self.freehand_path = None
-        self.freehand_points = []
+        self.freehand_count = 0
         self.region_placed.emit({'has_selection': False})
    
     def remove_selected_region(self):
@@ -768,9 +1103,17 @@ class InteractiveCanvas(QGraphicsView):
    
     def clear_regions(self):
         """Clear all regions from canvas"""
-        for item in list(self.region_items):
-            self.scene.removeItem(item)
+        # Suppress a selectionChanged emission per removed item, then emit once for all subscribers
+        selection_changed = any(item.isSelected() for item in self.region_items)
+        self.scene.blockSignals(True)
+        try:
+            for item in self.region_items:
+                self.scene.removeItem(item)
+        finally:
+            self.scene.blockSignals(False)
         self.region_items.clear()
+        if selection_changed:
+            self.scene.selectionChanged.emit()
         self.selected_region = None
    
     def create_eraser_cursor(self, size):
@@ -810,8 +1153,12 @@ class InteractiveCanvas(QGraphicsView):
         # Update cursor based on mode
         if enabled:
             if mode == "Erase":
-                # Use custom eraser cursor
-                eraser_cursor = self.create_eraser_cursor(min(max(size, 16), 32))
+                # Use custom eraser cursor (at most 17 distinct sizes, built once each)
+                cursor_size = min(max(size, 16), 32)
+                eraser_cursor = self._eraser_cursor_cache.get(cursor_size)
+                if eraser_cursor is None:
+                    eraser_cursor = self.create_eraser_cursor(cursor_size)
+                    self._eraser_cursor_cache[cursor_size] = eraser_cursor
                 self.setCursor(eraser_cursor)
             else:
                 # Use crosshair for paint mode
@@ -822,203 +1169,46 @@ class InteractiveCanvas(QGraphicsView):
         else:
             self.setCursor(Qt.ArrowCursor)
        
-    def get_augmented_image(self):
-        """Generate the final augmented image by painting the scene at scaled resolution."""
+    def get_augmented_arrays(self):
+        """Composite the scene in NumPy at scaled resolution.
+        Returns HxWx3 and HxW uint8 arrays that are reused, so they are only valid until the next call.
+        """
         if self.background_tensor is None or self.original_background_tensor is None:
             return None, None
        
-        # Use scaled image dimensions (75% of original)
-        display_h, display_w = self.background_tensor.shape[1], self.background_tensor.shape[2]
-       
-        # Render color image at scaled size
-        color_img = QImage(display_w, display_h, QImage.Format_RGB888)
-        color_img.fill(QColor(0, 0, 0))
-        painter = QPainter(color_img)
-        painter.setRenderHint(QPainter.SmoothPixmapTransform)
-        painter.setRenderHint(QPainter.Antialiasing)
-       
-        # Draw background at scaled size
-        if self.background_item:
-            painter.setOpacity(1.0)
-            bg_pixmap = self.background_item.pixmap()
-            painter.drawPixmap(0, 0, bg_pixmap)
-       
-        # Draw paint layer at scaled size
-        if self.paint_layer_item:
-            painter.setOpacity(1.0)
-            paint_pixmap = self.paint_layer_item.pixmap()
-            painter.drawPixmap(0, 0, paint_pixmap)
-       
-        # Draw defects with their current opacity at scaled size
-        for item in self.defect_items:
-            painter.setOpacity(float(item.opacity))
-            x = int(item.x())
-            y = int(item.y())
-            painter.drawPixmap(x, y, item.pixmap())
-       
-        # Draw regions with their current opacity at scaled size
-        for item in self.region_items:
-            painter.setOpacity(float(item.opacity))
-            x = int(item.x())
-            y = int(item.y())
-            painter.drawPixmap(x, y, item.pixmap())
-        painter.end()
-       
-        # Render mask (grayscale) at scaled size
-        mask_img = QImage(display_w, display_h, QImage.Format_Grayscale8)
-        mask_img.fill(0)
-       
-        mp = QPainter(mask_img)
-        mp.setRenderHint(QPainter.SmoothPixmapTransform)
-        mp.setRenderHint(QPainter.Antialiasing)
-        
-        # Draw paint layer to mask (convert alpha channel to white)
+        # Start from the displayed background (75% of original), in scratch buffers
+        # that are only reallocated when the image size changes
+        if self._scratch_color is None or self._scratch_color.shape != self.background_uint8.shape:
+            self._scratch_color = np.empty(self.background_uint8.shape, dtype=np.uint8)
+            self._scratch_mask = np.empty(self.background_uint8.shape[:2], dtype=np.uint8)
+        color_np = self._scratch_color
+        mask_np = self._scratch_mask
+        np.copyto(color_np, self.background_uint8)
+        mask_np.fill(0)
+       
+        # Blend paint layer by its alpha; strokes enter the mask where alpha > 10
         if self.paint_layer_item and self.paint_layer:
-            # Convert paint layer alpha channel to grayscale mask efficiently
-            paint_img = self.paint_layer.toImage()
-            paint_img = paint_img.convertToFormat(QImage.Format_RGBA8888)
-            
-            width = paint_img.width()
-            height = paint_img.height()
-            bytes_per_line = paint_img.bytesPerLine()
-            ptr = paint_img.bits()
-            ptr.setsize(height * bytes_per_line)
-            
-            # Convert to numpy array
-            img_array = np.frombuffer(ptr, dtype=np.uint8).reshape((height, bytes_per_line))
-            img_array = img_array[:, :width*4].reshape((height, width, 4))
-            
-            # Extract alpha channel and convert to binary mask
-            alpha_channel = img_array[:, :, 3]
-            paint_mask_array = np.where(alpha_channel > 10, 255, 0).astype(np.uint8)
-            
-            # Create QImage from numpy array
-            paint_mask = QImage(paint_mask_array.data, width, height, width, QImage.Format_Grayscale8)
-            paint_mask.bits().setsize(paint_mask_array.nbytes)
-            
-            mp.setOpacity(1.0)
-            mp.drawImage(0, 0, paint_mask)
-        
-        for item in self.defect_items:
-            if not item.exclude_masks:
-                mp.setOpacity(1.0)
-                x = int(item.x())
-                y = int(item.y())
-                mp.drawPixmap(x, y, item.mask_pixmap)
-        for item in self.region_items:
-            if not item.exclude_masks:
-                mp.setOpacity(1.0)
-                x = int(item.x())
-                y = int(item.y())
-                mp.drawPixmap(x, y, item.mask_pixmap)
-        mp.end()
-       
-        # Convert to tensors using improved method
-        color_tensor = self.qimage_to_tensor(color_img, channels=3)
-        mask_tensor = self.qimage_to_tensor(mask_img, channels=1)
-       
-        return color_tensor, mask_tensor
-
-    def qimage_to_tensor(self, qimage, channels=3):
-        """Robust conversion from QImage to tensor using QBuffer"""
-        try:
-            # Method 1: Direct memory access (for smaller images)
-            width = qimage.width()
-            height = qimage.height()
-           
-            if channels == 3:
-                qimage = qimage.convertToFormat(QImage.Format_RGB888)
-                bytes_per_line = qimage.bytesPerLine()
-               
-                # Check if we can safely access the buffer
-                expected_size = height * bytes_per_line
-                ptr = qimage.bits()
-                ptr.setsize(expected_size)
-               
-                # Create array with proper stride handling
-                arr = np.frombuffer(ptr, dtype=np.uint8).reshape((height, bytes_per_line))
-                # Extract only the actual image data (remove padding if any)
-                arr = arr[:, :width*3].reshape((height, width, 3))
-               
-            else:
-                qimage = qimage.convertToFormat(QImage.Format_Grayscale8)
-                bytes_per_line = qimage.bytesPerLine()
-               
-                expected_size = height * bytes_per_line
-                ptr = qimage.bits()
-                ptr.setsize(expected_size)
-               
-                arr = np.frombuffer(ptr, dtype=np.uint8).reshape((height, bytes_per_line))
-                # Extract only the actual image data
-                arr = arr[:, :width].reshape((height, width))
-               
-        except Exception as e:
-            print(f"Direct method failed: {e}, falling back to QBuffer method")
-            # Method 2: Fallback using QBuffer (more reliable for large images)
-            return self.qimage_to_tensor_buffer(qimage, channels)
-       
-        # Convert to tensor
-        arr = arr.copy()  # Ensure we own the data
-        if channels == 3:
-            tensor = torch.from_numpy(arr).float().permute(2, 0, 1) / 255.0
-        else:
-            tensor = torch.from_numpy(arr).float().unsqueeze(0) / 255.0
+            paint_rgb, paint_alpha = pixmap_to_rgba_arrays(self.paint_layer)
+            if paint_alpha.any():
+                self.apply_defect_to_image(color_np, None, paint_rgb, paint_alpha, 0, 0, 1.0)
+                mask_np[paint_alpha > 10] = 255
        
-        return tensor
-
-    def qimage_to_tensor_buffer(self, qimage, channels=3):
-        """Fallback method using QBuffer for problematic large images"""
-        # Convert QImage to PNG bytes using QBuffer
-        byte_array = QByteArray()
-        buffer = QBuffer(byte_array)
-        buffer.open(QIODevice.WriteOnly)
-       
-        # Save as PNG (lossless)
-        success = qimage.save(buffer, "PNG")
-        if not success:
-            raise RuntimeError("Failed to save QImage to buffer")
-       
-        buffer.close()
-       
-        # Load with PIL
-        pil_image = Image.open(io.BytesIO(byte_array.data()))
-       
-        # Convert to numpy
-        if channels == 1:
-            if pil_image.mode != 'L':
-                pil_image = pil_image.convert('L')
-            arr = np.array(pil_image)
-            tensor = torch.from_numpy(arr).float().unsqueeze(0) / 255.0
-        else:
-            if pil_image.mode != 'RGB':
-                pil_image = pil_image.convert('RGB')
-            arr = np.array(pil_image)
-            tensor = torch.from_numpy(arr).float().permute(2, 0, 1) / 255.0
-       
-        return tensor
-       
-    def pixmap_to_numpy(self, pixmap, grayscale=False):
-        """Convert QPixmap to numpy array"""
-        qimage = pixmap.toImage()
-        width, height = qimage.width(), qimage.height()
-       
-        if grayscale:
-            qimage = qimage.convertToFormat(QImage.Format_Grayscale8)
-            ptr = qimage.bits()
-            ptr.setsize(height * width)
-            arr = np.frombuffer(ptr, np.uint8).reshape((height, width))
-        else:
-            qimage = qimage.convertToFormat(QImage.Format_RGB888)
-            ptr = qimage.bits()
-            ptr.setsize(height * width * 3)
-            arr = np.frombuffer(ptr, np.uint8).reshape((height, width, 3))
-           
-        return arr
+        # Blend defects, then regions, with their current opacity from the cached arrays
+        for item in self.defect_items + self.region_items:
+            rgb, alpha = item.get_pixel_arrays()
+            item_mask = None if item.exclude_masks else mask_np
+            self.apply_defect_to_image(color_np, item_mask, rgb, alpha,
+                                       int(item.x()), int(item.y()), float(item.opacity))
+       
+        return color_np, mask_np
        
     def apply_defect_to_image(self, image, mask, defect, defect_mask, x, y, opacity):
-        """Apply defect to image at position"""
-        _, h_img, w_img = image.shape
-        h_def, w_def = defect_mask.shape if len(defect_mask.shape) == 2 else defect_mask.shape[:2]
+        """Alpha blend a defect into an image in place at position (x, y).
+        image is HxWx3 uint8, mask is HxW uint8 (takes the max with defect_mask, skipped if None),
+        defect is hxwx3 uint8 and defect_mask is hxw uint8.
+        """
+        h_img, w_img = image.shape[:2]
+        h_def, w_def = defect_mask.shape[:2]
        
         # Calculate valid region
         x_start = max(0, x)
@@ -1034,31 +1224,43 @@ class InteractiveCanvas(QGraphicsView):
        
         if x_end > x_start and y_end > y_start:
             # Extract regions
-            img_region = image[:, y_start:y_end, x_start:x_end]
+            img_region = image[y_start:y_end, x_start:x_end]
             def_region = defect[def_y_start:def_y_end, def_x_start:def_x_end]
             mask_region = defect_mask[def_y_start:def_y_end, def_x_start:def_x_end]
            
-            # Convert to tensors
-            def_tensor = torch.from_numpy(def_region).float() / 255.0
-            if len(def_tensor.shape) == 3:
-                def_tensor = def_tensor.permute(2, 0, 1)
+            # Nothing to blend or merge for an empty (e.g. fully padded) mask region
+            if not mask_region.any():
+                return
            
-            mask_tensor = torch.from_numpy(mask_region).float() / 255.0
-            if len(mask_tensor.shape) == 2:
-                mask_tensor = mask_tensor.unsqueeze(0)
-               
-            # Simple alpha blend
-            mask_3ch = mask_tensor.repeat(3, 1, 1)
-            blend_mask = mask_3ch * opacity
-            img_region[:] = img_region * (1 - blend_mask) + def_tensor * blend_mask
+            # An invisible defect still contributes to the mask, so only skip the blend
+            if opacity > 1e-3 and blend_uint8 is not None:
+                blend_uint8(img_region, def_region, mask_region, int(round(opacity * 256)))
+            elif opacity > 1e-3:
+                # Fixed-point alpha in [0, 256]; mask 255 at opacity 1.0 maps to exactly 256
+                alpha = mask_region.astype(np.uint32)
+                alpha += alpha >> 7
+                alpha *= int(round(opacity * 256))
+                alpha >>= 8
+                alpha = alpha.astype(np.uint16)[:, :, np.newaxis]
+           
+                # out = (img * (256 - a) + def * a) >> 8, bounded by 255 * 256 so uint16 suffices
+                blended = img_region.astype(np.uint16)
+                blended *= 256 - alpha
+                blended += def_region.astype(np.uint16) * alpha
+                blended >>= 8
+                img_region[:] = blended
            
             # Update mask
-            mask[0, y_start:y_end, x_start:x_end] = torch.max(
-                mask[0, y_start:y_end, x_start:x_end],
-                mask_tensor[0]
-            )
+            if mask is not None:
+                mask_out = mask[y_start:y_end, x_start:x_end]
+                np.maximum(mask_out, mask_region, out=mask_out)
+
 
+class ImageLoadSignals(QObject):
+    """Signals emitted when a target image decode finishes"""
    
+    # Image path and either (resized_tensor, original_tensor, qimage) or the raised exception
+    finished = pyqtSignal(str, object)
 
 
 class DefectPlacementTool(QMainWindow):
@@ -1070,15 +1272,43 @@ class DefectPlacementTool(QMainWindow):
         self.defect_images_dir = None
         self.defect_masks_dir = None
         self.current_image_path = None
+        self.pending_image_path = None  # Target image being loaded in the background
+        # Decodes finish on worker threads; the signal hands them to the GUI thread
+        self.target_load_signals = ImageLoadSignals()
+        self.target_load_signals.finished.connect(self.on_target_image_loaded)
         self.target_images = []  # List of image paths
+        self._target_image_index: Dict[str, int] = {}  # Image path -> position in target_images
+        self._next_index_cache: Dict[Tuple[str, str], int] = {}  # (output dir, base name) -> next free index
+        # Recent Save All outputs per target, keyed by path: (state hash, (image, mask, paint mask, metadata));
+        # full-size uint8 renders, so kept to an LRU
+        self._rendered_cache: "OrderedDict[str, Tuple[int, Tuple]]" = OrderedDict()
         self.defect_images = []  # List of defect image paths
         self.defect_masks = []   # List of defect mask paths
+        self.defect_image_types: Dict[str, str] = {}  # Defect image path -> defect type
+        self.defect_mask_types: Dict[str, str] = {}   # Defect mask path -> defect type
+        # Lookup indexes rebuilt whenever the defect directories are (re)loaded
+        self._defect_images_by_stem: Dict[str, str] = {}
+        self._defect_images_lower_stems: List[Tuple[str, str]] = []  # (lowercase stem, path)
+        self._mask_by_type_source: Dict[Tuple[str, str], str] = {}
         # Per-image augmentation state cache
         self.augmentation_states: Dict[str, Dict] = {}
         self.has_unsaved_changes = False
        
         # Paint layer cache
-        self.paint_layer_cache: Dict[str, QPixmap] = {}
+        self.paint_layer_cache: Dict[str, bytes] = {}  # PNG-encoded paint layers
+       
+        # Defect library converted to RGBA images in the background, keyed by mask path
+        self.defect_prebuild_pool = ThreadPoolExecutor(max_workers=WORKER_THREADS)
+        self.defect_prebuild_futures: Dict[Tuple[str, str], Future] = {}  # Keyed by (mask, image) path
+        # Cropped defect tensors for placements the prebuild has not covered, keyed by (mask, image) path
+        self._defect_tensor_cache: "OrderedDict[Tuple[str, str], Tuple[torch.Tensor, torch.Tensor]]" = OrderedDict()
+       
+        # Target images decoded ahead of selection, keyed by image path
+        self._decode_pool = ThreadPoolExecutor(max_workers=WORKER_THREADS)
+        self._decode_futures: Dict[str, Future] = {}
+        # Recently decoded targets as uint8 (resized, original) arrays, keyed by (path, mtime);
+        # full-size images, so kept small. Float tensors are derived from them on use
+        self._decoded_image_cache: "OrderedDict[Tuple[str, float], Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
        
         # Track which images have been saved
         self.saved_images: set = set()
@@ -1131,6 +1361,11 @@ class DefectPlacementTool(QMainWindow):
         # Create toolbar
         self.create_toolbar()
        
+        # Disabled while a target image is loading
+        self.editing_widgets = self.editing_groups + [
+            self.canvas, right_panel, self.save_action, self.save_all_action, self.clear_action
+        ]
+       
         # Status bar
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
@@ -1156,18 +1391,18 @@ class DefectPlacementTool(QMainWindow):
         toolbar.addSeparator()
        
         # Save augmented image
-        save_action = toolbar.addAction("Save Augmented")
-        save_action.triggered.connect(self.save_augmented_image)
+        self.save_action = toolbar.addAction("Save Augmented")
+        self.save_action.triggered.connect(self.save_augmented_image)
        
         toolbar.addSeparator()
        
         # Save all augmentations
-        save_all_action = toolbar.addAction("Save All Augmented…")
-        save_all_action.triggered.connect(self.save_all_augmentations)
+        self.save_all_action = toolbar.addAction("Save All Augmented…")
+        self.save_all_action.triggered.connect(self.save_all_augmentations)
        
         # Clear all
-        clear_action = toolbar.addAction("Clear All")
-        clear_action.triggered.connect(self.clear_all)
+        self.clear_action = toolbar.addAction("Clear All")
+        self.clear_action.triggered.connect(self.clear_all)
        
     def create_left_panel(self):
         """Create left control panel"""
@@ -1200,6 +1435,7 @@ class DefectPlacementTool(QMainWindow):
         self.scale_slider.setRange(25, 200)
         self.scale_slider.setValue(100)
         self.scale_slider.valueChanged.connect(self.update_defect_transform)
+        self.scale_slider.sliderReleased.connect(self.update_defect_transform)
         self.scale_label = QLabel("1.0x")
         scale_layout = QHBoxLayout()
         scale_layout.addWidget(self.scale_slider)
@@ -1212,6 +1448,7 @@ class DefectPlacementTool(QMainWindow):
         self.rotation_slider.setRange(-180, 180)
         self.rotation_slider.setValue(0)
         self.rotation_slider.valueChanged.connect(self.update_defect_transform)
+        self.rotation_slider.sliderReleased.connect(self.update_defect_transform)
         self.rotation_label = QLabel("0°")
         rotation_layout = QHBoxLayout()
         rotation_layout.addWidget(self.rotation_slider)
@@ -1224,6 +1461,7 @@ class DefectPlacementTool(QMainWindow):
         self.opacity_slider.setRange(10, 100)
         self.opacity_slider.setValue(70)
         self.opacity_slider.valueChanged.connect(self.update_defect_transform)
+        self.opacity_slider.sliderReleased.connect(self.update_defect_transform)
         self.opacity_label = QLabel("0.7")
         opacity_layout = QHBoxLayout()
         opacity_layout.addWidget(self.opacity_slider)
@@ -1346,6 +1584,9 @@ class DefectPlacementTool(QMainWindow):
         actions_group.setLayout(actions_layout)
         layout.addWidget(actions_group)
        
+        # Everything but the target list edits the current image
+        self.editing_groups = [transform_group, selection_group, brush_group, actions_group]
+       
         return panel
        
     def create_right_panel(self):
@@ -1404,23 +1645,26 @@ class DefectPlacementTool(QMainWindow):
             return
            
         # Scan for image files
-        self.target_images = []
-        for root, dirs, files in os.walk(self.target_images_dir):
-            for file in files:
-                if file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    self.target_images.append(os.path.join(root, file))
+        self.target_images = list(self._scan(self.target_images_dir))
+        self._target_image_index = {path: i for i, path in enumerate(self.target_images)}
        
         if not self.target_images:
             QMessageBox.warning(self, "Warning", "No image files found in the selected directory.")
             return
            
-        # Populate target list
-        self.target_list.clear()
-        for img_path in self.target_images[:50]:  # Limit to 50 for UI
-            img_name = os.path.basename(img_path)
-            item = QListWidgetItem(img_name)
-            item.setData(Qt.UserRole, img_path)
-            self.target_list.addItem(item)
+        # Populate target list (text and path only) with a single repaint
+        self.target_list.setUpdatesEnabled(False)
+        try:
+            self.target_list.clear()
+            for img_path in self.target_images[:50]:  # Limit to 50 for UI
+                item = QListWidgetItem(os.path.basename(img_path))
+                item.setData(Qt.UserRole, img_path)
+                self.target_list.addItem(item)
+        finally:
+            self.target_list.setUpdatesEnabled(True)
+           
+        # Decode the first targets ahead of the first click
+        self.prefetch_target_images(0)
            
         self.status_bar.showMessage(f"Loaded {len(self.target_images)} target images")
        
@@ -1437,16 +1681,16 @@ class DefectPlacementTool(QMainWindow):
             return
            
         # Scan for image files
-        self.defect_images = []
-        defect_types = set()
-        for root, dirs, files in os.walk(self.defect_images_dir):
-            for file in files:
-                if file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    img_path = os.path.join(root, file)
-                    self.defect_images.append(img_path)
-                    # Extract defect type from directory name
-                    defect_type = os.path.basename(root) if root != self.defect_images_dir else 'defect'
-                    defect_types.add(defect_type)
+        self.defect_images = list(self._scan(self.defect_images_dir))
+        self.defect_image_types = self._defect_types(self.defect_images, self.defect_images_dir)
+       
+        # Index by filename stem for mask -> image matching (first match wins, like the scan did)
+        self._defect_images_by_stem = {}
+        self._defect_images_lower_stems = []
+        for img_path in self.defect_images:
+            stem = os.path.splitext(os.path.basename(img_path))[0]
+            self._defect_images_by_stem.setdefault(stem, img_path)
+            self._defect_images_lower_stems.append((stem.lower(), img_path))
        
         if not self.defect_images:
             QMessageBox.warning(self, "Warning", "No defect image files found in the selected directory.")
@@ -1456,6 +1700,9 @@ class DefectPlacementTool(QMainWindow):
         if hasattr(self, 'defect_masks') and self.defect_masks:
             self._update_stats_display()
            
+        # Start converting the library in the background once images and masks are both known
+        self.prebuild_defect_library()
+           
         self.status_bar.showMessage(f"Loaded {len(self.defect_images)} defect images")
        
     def load_defect_masks(self):
@@ -1471,33 +1718,34 @@ class DefectPlacementTool(QMainWindow):
             return
            
         # Scan for mask files
-        self.defect_masks = []
-        defect_types = set()
-        for root, dirs, files in os.walk(self.defect_masks_dir):
-            for file in files:
-                if file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    mask_path = os.path.join(root, file)
-                    self.defect_masks.append(mask_path)
-                    # Extract defect type from directory name
-                    defect_type = os.path.basename(root) if root != self.defect_masks_dir else 'defect'
-                    defect_types.add(defect_type)
+        self.defect_masks = list(self._scan(self.defect_masks_dir))
+        self.defect_mask_types = self._defect_types(self.defect_masks, self.defect_masks_dir)
+        defect_types = set(self.defect_mask_types.values())
+       
+        # Index by the (type, source) pair stored in cached defect states
+        self._mask_by_type_source = {}
+        for mask_path in self.defect_masks:
+            key = (self.defect_mask_types[mask_path], os.path.basename(mask_path))
+            self._mask_by_type_source.setdefault(key, mask_path)
        
         if not self.defect_masks:
             QMessageBox.warning(self, "Warning", "No mask files found in the selected directory.")
             return
            
-        # Populate defect list
-        self.defect_list.clear()
-        for mask_path in self.defect_masks:
-            mask_name = os.path.basename(mask_path)
-            # Extract defect type from directory
-            relative_path = os.path.relpath(mask_path, self.defect_masks_dir)
-            defect_type = os.path.dirname(relative_path) if os.path.dirname(relative_path) else 'defect'
-           
-            item_text = f"{defect_type} - {mask_name}"
-            item = QListWidgetItem(item_text)
-            item.setData(Qt.UserRole, mask_path)
-            self.defect_list.addItem(item)
+        # Populate defect list without a repaint or signal per inserted item
+        self.defect_list.setUpdatesEnabled(False)
+        self.defect_list.blockSignals(True)
+        try:
+            self.defect_list.clear()
+            for mask_path in self.defect_masks:
+                mask_name = os.path.basename(mask_path)
+                item_text = f"{self.defect_mask_types[mask_path]} - {mask_name}"
+                item = QListWidgetItem(item_text)
+                item.setData(Qt.UserRole, mask_path)
+                self.defect_list.addItem(item)
+        finally:
+            self.defect_list.blockSignals(False)
+            self.defect_list.setUpdatesEnabled(True)
            
         # Update filter
         self.defect_filter.clear()
@@ -1508,6 +1756,9 @@ class DefectPlacementTool(QMainWindow):
         # Update stats
         self._update_stats_display()
        
+        # Start converting the library in the background once images and masks are both known
+        self.prebuild_defect_library()
+       
         self.status_bar.showMessage(f"Loaded {len(self.defect_masks)} defect masks")
    
     def _update_stats_display(self):
@@ -1517,17 +1768,7 @@ class DefectPlacementTool(QMainWindow):
         defect_mask_count = len(self.defect_masks) if hasattr(self, 'defect_masks') else 0
        
         # Collect all defect types from both images and masks
-        all_types = set()
-        if hasattr(self, 'defect_images') and self.defect_images:
-            for img_path in self.defect_images:
-                relative_path = os.path.relpath(img_path, self.defect_images_dir)
-                defect_type = os.path.dirname(relative_path) if os.path.dirname(relative_path) else 'defect'
-                all_types.add(defect_type)
-        if hasattr(self, 'defect_masks') and self.defect_masks:
-            for mask_path in self.defect_masks:
-                relative_path = os.path.relpath(mask_path, self.defect_masks_dir)
-                defect_type = os.path.dirname(relative_path) if os.path.dirname(relative_path) else 'defect'
-                all_types.add(defect_type)
+        all_types = set(self.defect_image_types.values()) | set(self.defect_mask_types.values())
        
         stats_text = f"Target Images: {target_count}\n"
         stats_text += f"Defect Images: {defect_image_count}\n"
@@ -1540,21 +1781,89 @@ class DefectPlacementTool(QMainWindow):
         self.stats_label.setText(stats_text)
            
     def on_target_selected(self, item):
-        """Handle target image selection"""
+        """Handle target image selection by loading the image in the background"""
         if not self.target_images:
             return
        
+        # Get image path from item data
+        image_path = item.data(Qt.UserRole)
+        self.pending_image_path = image_path
+        # Edits and saves would apply to the image being replaced, so hold them until it loads
+        self._set_editing_enabled(False)
+       
+        # Decode on a worker thread, reusing a cached or prefetched decode when there is one;
+        # the UI stays responsive meanwhile
+        cached = self._decoded_image_cache.get(self._decoded_image_key(image_path))
+        future = self._decode_futures.pop(image_path, None)
+        if cached is not None:
+            if future is not None:
+                future.cancel()
+            future = self._decode_pool.submit(lambda: cached)
+        elif future is None:
+            future = self._decode_pool.submit(self._decode_image, image_path)
+        future.add_done_callback(lambda done: self._on_target_decoded(image_path, done))
+       
+        # Decode the neighbours next, they are the likely next selections
+        self.prefetch_target_images(self._get_image_index_by_path(image_path) or 0)
+        self.status_bar.showMessage(f"Loading target: {os.path.basename(image_path)}...")
+   
+    def prefetch_target_images(self, center, radius=2):
+        """Decode the target images within radius of index center in the background"""
+        start = max(0, center - radius)
+        wanted = set(self.target_images[start:center + radius + 1])
+        wanted.discard(self.current_image_path)
+        wanted.discard(self.pending_image_path)
+       
+        # Drop prefetches that fell out of the window to bound memory
+        for path in list(self._decode_futures):
+            if path not in wanted:
+                self._decode_futures.pop(path).cancel()
+        for path in wanted:
+            self._prefetch_decode(path)
+   
+    def _prefetch_decode(self, image_path):
+        """Start decoding image_path in the background unless it is decoded or decoding already"""
+        if image_path in self._decode_futures or self._decoded_image_key(image_path) in self._decoded_image_cache:
+            return
+        self._decode_futures[image_path] = self._decode_pool.submit(self._decode_image, image_path)
+   
+    def _on_target_decoded(self, image_path, future):
+        """Build the tensors and display QImage of a decoded target (on the worker thread) and pass them to the GUI thread"""
+        if future.cancelled():
+            return
+        try:
+            arrays = future.result()
+            resized_tensor = uint8_to_tensor(arrays[0])
+            result = (arrays, resized_tensor, uint8_to_tensor(arrays[1]), tensor_to_qimage(resized_tensor))
+        except Exception as e:
+            result = e
+        self.target_load_signals.finished.emit(image_path, result)
+   
+    def _set_editing_enabled(self, enabled):
+        """Enable or disable the canvas and every control that edits or saves the current image"""
+        for widget in self.editing_widgets:
+            widget.setEnabled(enabled)
+   
+    def on_target_image_loaded(self, image_path, result):
+        """Display a target image once its background load has finished"""
+        if image_path != self.pending_image_path:
+            return  # Superseded by a newer selection
+        self.pending_image_path = None
+        self._set_editing_enabled(True)
+       
+        if isinstance(result, Exception):
+            QMessageBox.critical(self, "Error", f"Failed to load target image:\n{str(result)}")
+            return
+       
         try:
             # Save current state before switching
             self.save_current_state_to_cache()
-           
-            # Get image path from item data
-            image_path = item.data(Qt.UserRole)
             self.current_image_path = image_path
            
-            # Load and display the image
-            resized_tensor, original_tensor = self._load_image_tensor(image_path)
-            self.canvas.set_background_image(resized_tensor, original_tensor)
+            # Display the image, keeping its decode for Save All and reselection
+            arrays, resized_tensor, original_tensor, qimage = result
+            self._cache_decoded_image(image_path, arrays)
+            self.canvas.set_background_image(resized_tensor, original_tensor, qimage=qimage)
            
             # Restore cached defects for this image, if any
             self.restore_state_from_cache()
@@ -1565,117 +1874,157 @@ class DefectPlacementTool(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load target image:\n{str(e)}")
    
-    def _load_image_tensor(self, image_path):
-        """Load and convert image to tensor while preserving aspect ratio"""
-        image = Image.open(image_path).convert('RGB')
-       
-        # Get original dimensions
-        original_width, original_height = image.size
-       
-        # Calculate new dimensions while preserving aspect ratio
-        # Scale to 75% of original size
+    def _defect_types(self, paths, root_dir):
+        """Map each path to its defect type (directory relative to root_dir, 'defect' at the top level)"""
+        dir_types = {}
+        types = {}
+        for path in paths:
+            directory = os.path.dirname(path)
+            defect_type = dir_types.get(directory)
+            if defect_type is None:
+                relative_dir = os.path.relpath(directory, root_dir)
+                defect_type = relative_dir if relative_dir != os.curdir else 'defect'
+                dir_types[directory] = defect_type
+            types[path] = defect_type
+        return types
+   
+    def _scan(self, root):
+        """Yield image file paths under root (recursive, same order as os.walk)"""
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            subdirs = []
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                            yield entry.path
+            except OSError:
+                # Skip unreadable directories, as os.walk does
+                continue
+            stack.extend(reversed(subdirs))
+   
+    def _display_size(self, image_size):
+        """Display (width, height) for an image: 75% of original, at least 64 pixels per side"""
+        original_width, original_height = image_size
         scale_factor = 0.75
         new_width = int(original_width * scale_factor)
         new_height = int(original_height * scale_factor)
        
         # Ensure minimum size for very small images
-        new_width = max(new_width, 64)
-        new_height = max(new_height, 64)
-       
-        # Create original size tensor
-        original_transform = transforms.Compose([
-            transforms.ToTensor()
-        ])
-        original_tensor = original_transform(image)
-       
-        # Create resized tensor for display
-        resize_transform = transforms.Compose([
-            transforms.Resize((new_height, new_width)),
-            transforms.ToTensor()
-        ])
-        resized_tensor = resize_transform(image)
+        return max(new_width, 64), max(new_height, 64)
+   
+    def _decode_image(self, image_path):
+        """Decode an image to uint8 HxWx3 (resized for display, original) arrays while preserving aspect ratio"""
+        image = Image.open(image_path).convert('RGB')
        
-        return resized_tensor, original_tensor
+        # Resize for display (same bilinear filter as transforms.Resize)
+        resized = np.array(image.resize(self._display_size(image.size), Image.BILINEAR))
+        return resized, np.array(image)
+   
+    def _decoded_image_key(self, image_path):
+        """Key of an image in the decode cache, so a file changed on disk is decoded again"""
+        try:
+            return image_path, os.path.getmtime(image_path)
+        except OSError:
+            return image_path, None  # Missing file: never cached, the decode reports the error
+   
+    def _cache_decoded_image(self, image_path, arrays):
+        """Add the decoded arrays of an image to the small decode LRU (GUI thread only)"""
+        key = self._decoded_image_key(image_path)
+        self._decoded_image_cache[key] = arrays
+        self._decoded_image_cache.move_to_end(key)
+        if len(self._decoded_image_cache) > 8:
+            self._decoded_image_cache.popitem(last=False)
+   
+    def _load_image_tensor_cached(self, image_path):
+        """(resized, original) float tensors of an image, decoded through a small LRU and
+        consuming a pending prefetch if any (GUI thread only)
+        """
+        future = self._decode_futures.pop(image_path, None)
+        arrays = self._decoded_image_cache.get(self._decoded_image_key(image_path))
+        if arrays is not None:
+            if future is not None:
+                future.cancel()
+        elif future is not None and not future.cancelled():
+            arrays = future.result()
+        else:
+            arrays = self._decode_image(image_path)
+        self._cache_decoded_image(image_path, arrays)
+        return uint8_to_tensor(arrays[0]), uint8_to_tensor(arrays[1])
+   
+    def _load_display_tensor(self, image_path):
+        """Load an image as a tensor at display size only, without the full-size tensor"""
+        image = Image.open(image_path).convert('RGB')
+        return pil_to_tensor(image.resize(self._display_size(image.size), Image.BILINEAR))
    
     def _load_mask_tensor(self, mask_path, target_size=None):
-        """Load and convert mask to tensor, optionally resizing to match target size"""
+        """Load and convert mask to tensor, optionally resizing to match target size (h, w)"""
         mask = Image.open(mask_path).convert('L')
        
         if target_size is not None:
             # Resize to match target image size
-            transform = transforms.Compose([
-                transforms.Resize(target_size),
-                transforms.ToTensor()
-            ])
+            size = (target_size[1], target_size[0])
         else:
             # Use the same aspect-ratio preserving resize as images
-            original_width, original_height = mask.size
-            # Scale to 75% of original size
-            scale_factor = 0.75
-            new_width = int(original_width * scale_factor)
-            new_height = int(original_height * scale_factor)
-           
-            new_width = max(new_width, 64)
-            new_height = max(new_height, 64)
-           
-            transform = transforms.Compose([
-                transforms.Resize((new_height, new_width)),
-                transforms.ToTensor()
-            ])
+            size = self._display_size(mask.size)
+        mask = mask.resize(size, Image.BILINEAR)
        
-        mask_tensor = transform(mask)
-        return (mask_tensor > 0.5).float()
+        # Binarize on uint8 (> 127 is the same as > 0.5 after scaling to [0, 1])
+        return torch.from_numpy(np.array(mask) > 127).to(torch.float32).unsqueeze_(0)
    
     def save_current_state_to_cache(self):
         """Persist current canvas defect items and paint layer into the cache for the active image."""
         if not self.current_image_path:
             return
         key = self.current_image_path
+        # Fetch the transform attributes of an item in one call
+        get_transform = attrgetter('scale_factor', 'rotation_angle', 'opacity', 'exclude_masks')
+       
         items_state = []
         for item in self.canvas.defect_items:
+            data = item.defect_data
+            pos = item.pos()
+            scale, rotation, opacity, exclude_masks = get_transform(item)
             items_state.append({
-                'type': item.defect_data.get('type', 'unknown'),
-                'source': item.defect_data.get('source', 'unknown'),
-                'mask_path': item.defect_data.get('mask_path', None),
-                'defect_image_path': item.defect_data.get('defect_image_path', None),
-                'x': float(item.x()),
-                'y': float(item.y()),
-                'scale': float(item.scale_factor),
-                'rotation': float(item.rotation_angle),
-                'opacity': float(item.opacity),
-                'exclude_masks': item.exclude_masks,
+                'type': data.get('type', 'unknown'),
+                'source': data.get('source', 'unknown'),
+                'mask_path': data.get('mask_path', None),
+                'defect_image_path': data.get('defect_image_path', None),
+                'x': pos.x(),
+                'y': pos.y(),
+                'scale': float(scale),
+                'rotation': float(rotation),
+                'opacity': float(opacity),
+                'exclude_masks': exclude_masks,
             })
        
         regions_state = []
         for item in self.canvas.region_items:
+            data = item.region_data
+            pos = item.pos()
+            scale, rotation, opacity, exclude_masks = get_transform(item)
             regions_state.append({
-                'type': item.region_data.get('type', 'selected_region'),
-                'source': item.region_data.get('source', 'unknown'),
-                'original_rect': item.region_data.get('original_rect', None),
-                'x': float(item.x()),
-                'y': float(item.y()),
-                'scale': float(item.scale_factor),
-                'rotation': float(item.rotation_angle),
-                'opacity': float(item.opacity),
-                'exclude_masks': item.exclude_masks,
+                'type': data.get('type', 'selected_region'),
+                'source': data.get('source', 'unknown'),
+                'original_rect': data.get('original_rect', None),
+                'freehand_points': data.get('freehand_points'),
+                'x': pos.x(),
+                'y': pos.y(),
+                'scale': float(scale),
+                'rotation': float(rotation),
+                'opacity': float(opacity),
+                'exclude_masks': exclude_masks,
             })
        
-        # Save paint layer if it exists and has content
+        # Save paint layer if it exists and has content, PNG-encoded since strokes are sparse
         paint_layer_data = None
-        if self.canvas.paint_layer and not self.canvas.paint_layer.isNull():
+        if self.canvas.paint_layer_dirty and self.canvas.paint_layer and not self.canvas.paint_layer.isNull():
             # Check if paint layer has any non-transparent content
-            paint_image = self.canvas.paint_layer.toImage()
-            has_content = False
-            for x in range(paint_image.width()):
-                for y in range(paint_image.height()):
-                    if paint_image.pixelColor(x, y).alpha() > 0:
-                        has_content = True
-                        break
-                if has_content:
-                    break
-           
-            if has_content:
-                paint_layer_data = self.canvas.paint_layer.copy()
+            if pixmap_has_content(self.canvas.paint_layer):
+                paint_layer_data = pixmap_to_png_bytes(self.canvas.paint_layer)
        
         self.augmentation_states[key] = {
             'items': items_state,
@@ -1704,9 +2053,12 @@ class DefectPlacementTool(QMainWindow):
        
         # Restore paint layer if it exists
         paint_layer_data = state.get('paint_layer')
-        if paint_layer_data and not paint_layer_data.isNull():
-            self.canvas.paint_layer = paint_layer_data.copy()
-            self.canvas.paint_layer_item.setPixmap(self.canvas.paint_layer)
+        if paint_layer_data:
+            paint_layer = png_bytes_to_pixmap(paint_layer_data)
+            if not paint_layer.isNull():
+                self.canvas.paint_layer = paint_layer
+                self.canvas.paint_layer_dirty = True
+                self.canvas.paint_layer_item.setPixmap(self.canvas.paint_layer)
        
         for entry in state.get('items', []):
             # Try to find the mask by path or by type and source
@@ -1714,14 +2066,15 @@ class DefectPlacementTool(QMainWindow):
             defect_image_path = entry.get('defect_image_path')
            
             if not mask_path or not os.path.exists(mask_path):
-                # Fallback: find by type and source name
+                # Fallback: find by type and source name, exact match first
                 defect_type = entry['type']
                 source_name = entry.get('source', '')
-                mask_path = None
-                for mask in self.defect_masks:
-                    if defect_type in os.path.dirname(mask) and source_name in os.path.basename(mask):
-                        mask_path = mask
-                        break
+                mask_path = self._mask_by_type_source.get((defect_type, source_name))
+                if not mask_path:
+                    for mask in self.defect_masks:
+                        if defect_type in os.path.dirname(mask) and source_name in os.path.basename(mask):
+                            mask_path = mask
+                            break
                 if not mask_path:
                     continue
            
@@ -1732,27 +2085,8 @@ class DefectPlacementTool(QMainWindow):
                     continue
            
             try:
-                # Load the defect image first
-                defect_image_tensor, _ = self._load_image_tensor(defect_image_path)
-               
-                # Load the mask with the same size as the defect image
-                mask_tensor = self._load_mask_tensor(mask_path, target_size=(defect_image_tensor.shape[1], defect_image_tensor.shape[2]))
-               
-                # Extract only the defect region using the mask
-                defect_tensor = defect_image_tensor * mask_tensor
-               
-                # Crop to tight bounding box around the defect
-                defect_tensor, mask_tensor = self._crop_to_defect_bounding_box(defect_tensor, mask_tensor)
-               
-                self.canvas.add_defect(
-                    defect_tensor,
-                    mask_tensor,
-                    {
-                        'type': entry['type'],
-                        'source': entry.get('source', 'unknown'),
-                        'mask_path': mask_path,
-                        'defect_image_path': defect_image_path
-                    },
+                self._place_defect(
+                    mask_path, defect_image_path, entry['type'], entry.get('source', 'unknown'),
                     position=(entry['x'], entry['y']),
                     opacity_override=entry['opacity'],
                     exclude_masks=entry.get('exclude_masks', False)
@@ -1765,37 +2099,37 @@ class DefectPlacementTool(QMainWindow):
         # Restore regions
         for entry in state.get('regions', []):
             try:
-                # Create a simple region from the original rect
+                # Rebuild the region from its original rect, masked by its polygon if freehand
                 original_rect = entry.get('original_rect')
                 if not original_rect:
                     continue
                    
                 x, y, w, h = original_rect
+                freehand_points = entry.get('freehand_points')
                
                 # Extract region from current background image
                 if self.canvas.background_item:
-                    region_pixmap = self.canvas.background_item.pixmap().copy(x, y, w, h)
-                   
-                    # Create mask
-                    mask_pixmap = QPixmap(w, h)
-                    mask_pixmap.fill(Qt.white)
+                    region_data = {
+                        'type': entry['type'],
+                        'source': entry.get('source', 'unknown'),
+                        'original_rect': original_rect
+                    }
+                    if freehand_points is not None:
+                        region_pixmap = self.canvas.freehand_region_pixmap(x, y, w, h, freehand_points)
+                        region_data['freehand_points'] = freehand_points
+                    else:
+                        # Rectangular regions are fully opaque, so their mask is the whole rect
+                        region_pixmap = self.canvas.background_item.pixmap().copy(x, y, w, h)
                    
-                    # Create region item
                     region_item = SelectedRegionItem(
-                        region_pixmap,
-                        mask_pixmap,
-                        {
-                            'type': entry['type'],
-                            'source': entry.get('source', 'unknown'),
-                            'original_rect': original_rect
-                        },
+                        region_pixmap, region_data,
                         exclude_masks=entry.get('exclude_masks', False)
                     )
                    
                     # Set position and add to scene
                     region_item.setPos(entry['x'], entry['y'])
-                    self.scene.addItem(region_item)
-                    self.region_items.append(region_item)
+                    self.canvas.scene.addItem(region_item)
+                    self.canvas.region_items.append(region_item)
                    
                     # Apply transform parameters
                     region_item.update_transform(entry['scale'], entry['rotation'], entry['opacity'])
@@ -1814,8 +2148,7 @@ class DefectPlacementTool(QMainWindow):
            
         # Get mask path from item data
         mask_path = item.data(Qt.UserRole)
-        item_text = item.text()
-        defect_type = item_text.split(" - ")[0]
+        defect_type = self.defect_mask_types[mask_path]
        
         try:
             # Find the corresponding defect image first
@@ -1824,33 +2157,9 @@ class DefectPlacementTool(QMainWindow):
                 QMessageBox.warning(self, "Warning", f"No corresponding defect image found for {os.path.basename(mask_path)}")
                 return
                
-            # Load the defect image
-            defect_image_tensor, _ = self._load_image_tensor(defect_image_path)
-           
-            # Load the mask with the same size as the defect image
-            mask_tensor = self._load_mask_tensor(mask_path, target_size=(defect_image_tensor.shape[1], defect_image_tensor.shape[2]))
-           
-            # Extract only the defect region using the mask
-            # The mask tells us where the defect is in the original image
-            # Apply the mask to each channel and set background to transparent (0)
-            defect_tensor = defect_image_tensor * mask_tensor
-           
-            # Crop to tight bounding box around the defect
-            defect_tensor, mask_tensor = self._crop_to_defect_bounding_box(defect_tensor, mask_tensor)
-           
             # Add to canvas
-            exclude_masks = self.exclude_mask_cb.isChecked()
-            self.canvas.add_defect(
-                defect_tensor,
-                mask_tensor,
-                {
-                    'type': defect_type,
-                    'source': os.path.basename(mask_path),
-                    'mask_path': mask_path,
-                    'defect_image_path': defect_image_path
-                },
-                exclude_masks=exclude_masks
-            )
+            self._place_defect(mask_path, defect_image_path, defect_type, os.path.basename(mask_path),
+                               exclude_masks=self.exclude_mask_cb.isChecked())
            
             # Reset transformation controls to defaults for the new defect
             self.scale_slider.setValue(100)
@@ -1865,20 +2174,111 @@ class DefectPlacementTool(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load defect mask:\n{str(e)}")
                
+    def _place_defect(self, mask_path, defect_image_path, defect_type, source, **placement):
+        """Add a library defect to the canvas; placement is passed on to canvas.add_defect.
+        Uses the image prebuilt in the background when ready, else the cached cropped tensors.
+        """
+        defect_info = {
+            'type': defect_type,
+            'source': source,
+            'mask_path': mask_path,
+            'defect_image_path': defect_image_path
+        }
+        qimage = self._get_prebuilt_defect_image(mask_path, defect_image_path)
+        if qimage is not None:
+            self.canvas.add_defect_image(qimage, defect_info, **placement)
+        else:
+            defect_tensor, mask_tensor = self._prepare_defect_tensors(mask_path, defect_image_path)
+            self.canvas.add_defect(defect_tensor, mask_tensor, defect_info, **placement)
+   
+    def _build_defect_tensors(self, mask_path, defect_image_path):
+        """Load a defect image and its mask, and crop both to the defect"""
+        # Load the defect image, at display size only
+        defect_image_tensor = self._load_display_tensor(defect_image_path)
+       
+        # Load the mask with the same size as the defect image
+        mask_tensor = self._load_mask_tensor(mask_path, target_size=(defect_image_tensor.shape[1], defect_image_tensor.shape[2]))
+       
+        # Extract only the defect region using the mask
+        # The mask tells us where the defect is in the original image
+        # Apply the mask to each channel and set background to transparent (0)
+        defect_tensor = defect_image_tensor * mask_tensor
+       
+        # Crop to tight bounding box around the defect
+        return self._crop_to_defect_bounding_box(defect_tensor, mask_tensor)
+   
+    def _prepare_defect_tensors(self, mask_path, defect_image_path):
+        """Cropped (defect_tensor, mask_tensor) for a library defect, from an LRU cache when possible.
+        GUI thread only; the returned tensors are shared and must not be modified in place.
+        """
+        key = (mask_path, defect_image_path)
+        cached = self._defect_tensor_cache.get(key)
+        if cached is not None:
+            self._defect_tensor_cache.move_to_end(key)
+            return cached
+       
+        cached = self._build_defect_tensors(mask_path, defect_image_path)
+        self._defect_tensor_cache[key] = cached
+        if len(self._defect_tensor_cache) > DEFECT_CACHE_SIZE:
+            self._defect_tensor_cache.popitem(last=False)
+        return cached
+   
+    def _build_defect_image(self, mask_path, defect_image_path):
+        """Build the RGBA QImage for a library defect (runs on a prebuild worker thread)"""
+        defect_tensor, mask_tensor = self._build_defect_tensors(mask_path, defect_image_path)
+        return defect_to_rgba_qimage(defect_tensor, mask_tensor)
+   
+    def prebuild_defect_library(self):
+        """Convert the first DEFECT_CACHE_SIZE library defects to RGBA images in the background
+        so placing one is cheap; the rest are converted on placement through the tensor cache.
+        Conversions of unchanged (mask, image) pairs from a previous call are kept.
+        """
+        previous = self.defect_prebuild_futures
+        self.defect_prebuild_futures = {}
+        if self.defect_images and self.defect_masks:
+            for mask_path in self.defect_masks[:DEFECT_CACHE_SIZE]:
+                defect_image_path = self._find_corresponding_defect_image(mask_path)
+                if not defect_image_path:
+                    continue
+                key = (mask_path, defect_image_path)
+                future = previous.pop(key, None)
+                if future is None:
+                    future = self.defect_prebuild_pool.submit(self._build_defect_image, mask_path, defect_image_path)
+                self.defect_prebuild_futures[key] = future
+        for future in previous.values():
+            future.cancel()
+   
+    def _get_prebuilt_defect_image(self, mask_path, defect_image_path):
+        """Return the prebuilt RGBA QImage for a defect, or None if it is not ready"""
+        future = self.defect_prebuild_futures.get((mask_path, defect_image_path))
+        if future is None or not future.done() or future.cancelled() or future.exception() is not None:
+            return None
+        return future.result()
+   
+    def _mask_extent(self, mask):
+        """Inclusive (y_min, y_max, x_min, x_max) of mask values > 0.5, or None for an empty mask.
+        Projects the mask onto each axis instead of materializing the coordinates of every pixel.
+        """
+        mask_binary = mask.squeeze(0) > 0.5
+        rows = mask_binary.any(dim=1).float()
+        if not rows.any():
+            return None
+        cols = mask_binary.any(dim=0).float()
+       
+        # argmax returns the first maximal index, from either end
+        y_min = int(rows.argmax())
+        y_max = len(rows) - 1 - int(rows.flip(0).argmax())
+        x_min = int(cols.argmax())
+        x_max = len(cols) - 1 - int(cols.flip(0).argmax())
+        return y_min, y_max, x_min, x_max
+   
     def _crop_to_defect_bounding_box(self, defect_tensor, mask_tensor):
         """Crop defect and mask to tight bounding box around the defect"""
-        if mask_tensor.sum() == 0:
-            return defect_tensor, mask_tensor
-           
         # Find bounding box of non-zero mask values
-        mask_binary = mask_tensor > 0.5
-        coords = torch.where(mask_binary.squeeze(0))
-       
-        if len(coords[0]) == 0:
+        extent = self._mask_extent(mask_tensor)
+        if extent is None:
             return defect_tensor, mask_tensor
-           
-        y_min, y_max = coords[0].min().item(), coords[0].max().item()
-        x_min, x_max = coords[1].min().item(), coords[1].max().item()
+        y_min, y_max, x_min, x_max = extent
        
         # Add small margin for better visual appearance
         margin = 5
@@ -1895,18 +2295,11 @@ class DefectPlacementTool(QMainWindow):
 
     def extract_defect(self, image, mask):
         """Extract defect region from image"""
-        if mask.sum() == 0:
-            return None, None
-           
         # Find bounding box
-        mask_binary = mask > 0.5
-        coords = torch.where(mask_binary.squeeze(0))
-       
-        if len(coords[0]) == 0:
+        extent = self._mask_extent(mask)
+        if extent is None:
             return None, None
-           
-        y_min, y_max = coords[0].min().item(), coords[0].max().item()
-        x_min, x_max = coords[1].min().item(), coords[1].max().item()
+        y_min, y_max, x_min, x_max = extent
        
         # Add margin
         margin = 10
@@ -1930,13 +2323,15 @@ class DefectPlacementTool(QMainWindow):
         scale = self.scale_slider.value() / 100.0
         rotation = self.rotation_slider.value()
         opacity = self.opacity_slider.value() / 100.0
+        # Fast preview while a slider is dragged, smooth pass once it is released
+        interactive = any(slider.isSliderDown() for slider in (self.scale_slider, self.rotation_slider, self.opacity_slider))
        
         self.scale_label.setText(f"{scale:.1f}x")
         self.rotation_label.setText(f"{rotation}°")
         self.opacity_label.setText(f"{opacity:.1f}")
        
         # Update selected item (defect or region)
-        selected_item.update_transform(scale, rotation, opacity)
+        selected_item.update_transform(scale, rotation, opacity, interactive=interactive)
         self._mark_unsaved()
        
     # [Removed] toggle_mask_display
@@ -1968,6 +2363,10 @@ class DefectPlacementTool(QMainWindow):
         self.canvas.clear_paint_layer()
         self.canvas.scene.clear()
         self.canvas.background_item = None
+        self.canvas.paint_layer = None
+        self.canvas.paint_layer_item = None
+        self.canvas.selection_item = None
+        self.canvas.freehand_item = None
         self.canvas.selected_defect = None
         self.canvas.selected_region = None
         self.status_bar.showMessage("Cleared canvas")
@@ -2035,16 +2434,14 @@ class DefectPlacementTool(QMainWindow):
    
     def has_unsaved_paint_changes(self):
         """Check if there are unsaved paint changes"""
+        # Never painted on since the last clear: nothing to scan
+        if not self.canvas.paint_layer_dirty:
+            return False
         if not self.canvas.paint_layer or self.canvas.paint_layer.isNull():
             return False
        
         # Check if paint layer has any non-transparent content
-        paint_image = self.canvas.paint_layer.toImage()
-        for x in range(paint_image.width()):
-            for y in range(paint_image.height()):
-                if paint_image.pixelColor(x, y).alpha() > 0:
-                    return True
-        return False
+        return pixmap_has_content(self.canvas.paint_layer)
        
     # [Removed] on_blend_mode_changed (blend mode removed)
 
@@ -2052,85 +2449,26 @@ class DefectPlacementTool(QMainWindow):
        
     def filter_defects(self, filter_type):
         """Filter defect list by type"""
-        # Hide or show items based on filter
+        # Hide or show items based on filter, relaying out once and only touching changed items
         first_visible_index = None
-        for i in range(self.defect_list.count()):
-            item = self.defect_list.item(i)
-            is_visible = (filter_type == "All" or filter_type == item.text().split(" - ")[0])
-            item.setHidden(not is_visible)
-            if is_visible and first_visible_index is None:
-                first_visible_index = i
+        self.defect_list.setUpdatesEnabled(False)
+        try:
+            for i in range(self.defect_list.count()):
+                item = self.defect_list.item(i)
+                defect_type = self.defect_mask_types.get(item.data(Qt.UserRole))
+                is_visible = (filter_type == "All" or filter_type == defect_type)
+                if item.isHidden() == is_visible:
+                    item.setHidden(not is_visible)
+                if is_visible and first_visible_index is None:
+                    first_visible_index = i
+        finally:
+            self.defect_list.setUpdatesEnabled(True)
         # Auto-select the first visible item so actions use the intended type
         if first_visible_index is not None:
             self.defect_list.setCurrentRow(first_visible_index)
                
     # [Removed] preview_result and show_preview
    
-    def extract_segmentation_from_mask(self, mask_pixmap, position):
-        """Extract segmentation polygon and bounding box from a mask pixmap
-        
-        Args:
-            mask_pixmap: QPixmap containing the mask
-            position: (x, y) position of the item in the scene
-            
-        Returns:
-            dict with 'bbox' and 'segmentation' keys, or None if extraction fails
-        """
-        try:
-            # Convert QPixmap to QImage
-            mask_image = mask_pixmap.toImage()
-            
-            # Convert to numpy array
-            width = mask_image.width()
-            height = mask_image.height()
-            
-            # Handle different image formats
-            if mask_image.format() != QImage.Format_Grayscale8:
-                mask_image = mask_image.convertToFormat(QImage.Format_Grayscale8)
-            
-            bytes_per_line = mask_image.bytesPerLine()
-            ptr = mask_image.bits()
-            ptr.setsize(height * bytes_per_line)
-            
-            # Create numpy array from mask
-            mask_array = np.frombuffer(ptr, dtype=np.uint8).reshape((height, bytes_per_line))
-            mask_array = mask_array[:, :width].copy()
-            
-            # Threshold to binary
-            _, binary_mask = cv2.threshold(mask_array, 127, 255, cv2.THRESH_BINARY)
-            
-            # Find contours
-            contours, _ = cv2.findContours(binary_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            if not contours:
-                return None
-            
-            # Get the largest contour
-            largest_contour = max(contours, key=cv2.contourArea)
-            
-            # Get bounding box
-            x, y, w, h = cv2.boundingRect(largest_contour)
-            
-            # Convert to absolute coordinates (add item position)
-            item_x, item_y = position
-            abs_bbox = [item_x + x, item_y + y, w, h]
-            
-            # Extract segmentation points and convert to absolute coordinates
-            segmentation = []
-            for point in largest_contour:
-                px = float(point[0][0] + item_x)
-                py = float(point[0][1] + item_y)
-                segmentation.append([px, py])
-            
-            return {
-                'bbox': abs_bbox,
-                'segmentation': [segmentation]  # COCO format: list of polygons
-            }
-            
-        except Exception as e:
-            print(f"Error extracting segmentation: {e}")
-            return None
-    
     def extract_paint_strokes_segmentation(self):
         """Extract segmentation from paint layer
         
@@ -2237,9 +2575,21 @@ class DefectPlacementTool(QMainWindow):
             print(f"Error creating paint mask tensor: {e}")
             return None
    
+    def _write_png(self, path, image, compression_level=3):
+        """Write a uint8 HxWx3 / HxW array or a CHW float tensor in [0, 1] as PNG through libpng.
+        A lower compression level than PIL's default is much faster for a slightly larger file.
+        """
+        if isinstance(image, np.ndarray):
+            tensor = torch.from_numpy(image)
+            tensor = tensor.unsqueeze(0) if tensor.dim() == 2 else tensor.permute(2, 0, 1)
+        else:
+            # Same truncating float -> uint8 conversion as torchvision's to_pil_image
+            tensor = image.clamp(0, 1).mul(255).to(torch.uint8)
+        write_png(tensor, path, compression_level=compression_level)
+   
     def save_augmented_image(self):
         """Save the augmented image and mask"""
-        result_image, result_mask = self.canvas.get_augmented_image()
+        result_image, result_mask = self.canvas.get_augmented_arrays()
        
         if result_image is None:
             QMessageBox.information(self, "Info", "No defects placed yet")
@@ -2259,74 +2609,29 @@ class DefectPlacementTool(QMainWindow):
             self.last_directory = os.path.dirname(save_path)
        
         if save_path:
+            # write_png ignores the extension, so add the one the sibling file names are derived from
+            if not save_path.lower().endswith('.png'):
+                save_path += '.png'
+            base_path = save_path[:-len('.png')]
+           
             # Save image
-            image_pil = TF.to_pil_image(result_image)
-            image_pil.save(save_path)
+            self._write_png(save_path, result_image)
            
             # Save mask only if there are items that were created in normal mode
             if has_normal_mode_items:
-                mask_path = save_path.replace('.png', '_mask.png')
-                mask_pil = TF.to_pil_image(result_mask)
-                mask_pil.save(mask_path)
+                mask_path = base_path + '_mask.png'
+                self._write_png(mask_path, result_mask)
             
             # Save paint mask separately if paint strokes exist
             paint_mask_tensor = self.get_paint_mask_tensor()
             if paint_mask_tensor is not None:
-                paint_mask_path = save_path.replace('.png', '_paint_mask.png')
-                paint_mask_pil = TF.to_pil_image(paint_mask_tensor)
-                paint_mask_pil.save(paint_mask_path)
+                paint_mask_path = base_path + '_paint_mask.png'
+                self._write_png(paint_mask_path, paint_mask_tensor)
            
             # Save metadata
-            # Extract segmentation for defects
-            defects_metadata = []
-            for item in self.canvas.defect_items:
-                defect_meta = {
-                    'label': item.defect_data.get('type', 'unknown'),
-                    'position': item.get_position(),
-                    'scale': item.scale_factor,
-                    'rotation': item.rotation_angle,
-                    'opacity': item.opacity,
-                    'mask_path': item.defect_data.get('mask_path') if not item.exclude_masks else None,
-                    'defect_image_path': item.defect_data.get('defect_image_path') if not item.exclude_masks else None
-                }
-                
-                # Extract segmentation from mask if not excluded
-                if not item.exclude_masks and hasattr(item, 'mask_pixmap'):
-                    seg_data = self.extract_segmentation_from_mask(item.mask_pixmap, item.get_position())
-                    if seg_data:
-                        defect_meta['bbox'] = seg_data['bbox']
-                        defect_meta['segmentation'] = seg_data['segmentation']
-                
-                defects_metadata.append(defect_meta)
-            
-            # Extract segmentation for regions
-            regions_metadata = []
-            for item in self.canvas.region_items:
-                region_meta = {
-                    'label': 'selection_label',
-                    'position': item.get_position(),
-                    'scale': item.scale_factor,
-                    'rotation': item.rotation_angle,
-                    'opacity': item.opacity,
-                    'original_rect': item.region_data.get('original_rect') if not item.exclude_masks else None,
-                    'source': item.region_data.get('source', 'unknown') if not item.exclude_masks else None
-                }
-                
-                # Extract segmentation from mask if not excluded
-                if not item.exclude_masks:
-                    # Try to get segmentation from mask
-                    if hasattr(item, 'mask_pixmap'):
-                        seg_data = self.extract_segmentation_from_mask(item.mask_pixmap, item.get_position())
-                        if seg_data:
-                            region_meta['bbox'] = seg_data['bbox']
-                            region_meta['segmentation'] = seg_data['segmentation']
-                    # Fallback to freehand_points if available
-                    elif item.region_data.get('freehand_points'):
-                        region_meta['segmentation'] = [item.region_data.get('freehand_points')]
-                        if item.region_data.get('original_rect'):
-                            region_meta['bbox'] = item.region_data.get('original_rect')
-                
-                regions_metadata.append(region_meta)
+            # Defect and region metadata, with segmentation from their (cached) mask contours
+            defects_metadata = [item.to_metadata_dict() for item in self.canvas.defect_items]
+            regions_metadata = [item.to_metadata_dict() for item in self.canvas.region_items]
             
             # Extract segmentation from paint layer
             paint_strokes = self.extract_paint_strokes_segmentation()
@@ -2348,7 +2653,7 @@ class DefectPlacementTool(QMainWindow):
                 'paint_strokes': paint_strokes_metadata
             }
            
-            meta_path = save_path.replace('.png', '_metadata.json')
+            meta_path = base_path + '_metadata.json'
             with open(meta_path, 'w') as f:
                 json.dump(metadata, f, indent=2)
                
@@ -2370,34 +2675,26 @@ class DefectPlacementTool(QMainWindow):
    
     def _find_next_index(self, directory: str, base_name: str) -> int:
         """Return next integer index to use for files named like base_name_#.png in directory."""
+        # Indices handed out by this session are remembered; rescan only if that file appeared meanwhile
+        cached = self._next_index_cache.get((directory, base_name))
+        if cached is not None and not os.path.exists(os.path.join(directory, f"{base_name}_{cached}.png")):
+            return cached
+       
+        pattern = re.compile(rf"^{re.escape(base_name)}_(\d+)\.(?i:png)$")
+        max_idx = 0
         try:
-            existing = os.listdir(directory)
-        except Exception:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    match = pattern.match(entry.name)
+                    if match:
+                        max_idx = max(max_idx, int(match.group(1)))
+        except OSError:
             return 1
-        prefix = f"{base_name}_"
-        max_idx = 0
-        for name in existing:
-            if not name.lower().endswith('.png'):
-                continue
-            if not name.startswith(prefix):
-                continue
-            stem = name[:-4]
-            parts = stem.split('_')
-            if len(parts) < 2:
-                continue
-            try:
-                idx = int(parts[-1])
-                if idx > max_idx:
-                    max_idx = idx
-            except ValueError:
-                continue
+        self._next_index_cache[(directory, base_name)] = max_idx + 1
         return max_idx + 1
 
     def _get_image_index_by_path(self, image_path: str) -> Optional[int]:
-        try:
-            return self.target_images.index(image_path)
-        except ValueError:
-            return None
+        return self._target_image_index.get(image_path)
    
     def _find_corresponding_defect_image(self, mask_path: str) -> Optional[str]:
         """Find the corresponding defect image for a given mask path by matching filenames"""
@@ -2408,17 +2705,15 @@ class DefectPlacementTool(QMainWindow):
         mask_filename = os.path.splitext(os.path.basename(mask_path))[0]
        
         # Try to find exact filename match first
-        for defect_img in self.defect_images:
-            defect_filename = os.path.splitext(os.path.basename(defect_img))[0]
-            if defect_filename == mask_filename:
-                return defect_img
+        defect_img = self._defect_images_by_stem.get(mask_filename)
+        if defect_img:
+            return defect_img
        
         # If no exact match, try partial matching (in case of slight naming differences)
-        for defect_img in self.defect_images:
-            defect_filename = os.path.splitext(os.path.basename(defect_img))[0]
+        mask_lower = mask_filename.lower()
+        for defect_lower, defect_img in self._defect_images_lower_stems:
             # Check if one filename contains the other (case-insensitive)
-            if (mask_filename.lower() in defect_filename.lower() or
-                defect_filename.lower() in mask_filename.lower()):
+            if mask_lower in defect_lower or defect_lower in mask_lower:
                 return defect_img
        
         # If still no match, try to match by defect type directory
@@ -2436,6 +2731,80 @@ class DefectPlacementTool(QMainWindow):
                
         return None
 
+    def _state_hash(self, key):
+        """Hash of everything a cached state renders from: items, regions, paint layer, the target file
+        and the defect library (its directories and the modification times of the files the items use)
+        """
+        state = self.augmentation_states[key]
+        items = state.get('items') or []
+        library_paths = {entry.get(name) for entry in items for name in ('mask_path', 'defect_image_path')}
+        library_mtimes = tuple(sorted((path, os.path.getmtime(path))
+                                      for path in library_paths if path and os.path.exists(path)))
+        # Freehand polygons are hashed by their bytes, repr() of a long array is abbreviated
+        regions = tuple(
+            (repr({name: value for name, value in entry.items() if name != 'freehand_points'}),
+             None if entry.get('freehand_points') is None else entry['freehand_points'].tobytes())
+            for entry in state.get('regions') or []
+        )
+        return hash((repr(items), regions, state.get('paint_layer'), os.path.getmtime(key),
+                     self.defect_images_dir, self.defect_masks_dir, library_mtimes))
+   
+    def _render_state_outputs(self, key):
+        """Restore the cached state of target key on the canvas and render everything Save All writes.
+        Returns (image, mask or None, paint mask tensor or None, metadata), or None if nothing rendered.
+        """
+        # Load target image
+        self.current_image_path = key
+        resized_tensor, original_tensor = self._load_image_tensor_cached(key)
+        self.canvas.set_background_image(resized_tensor, original_tensor)
+        # Restore this image's state
+        self.restore_state_from_cache()
+        # Render into the canvas scratch buffers, saved as uint8 without a float round trip
+        result_image, result_mask = self.canvas.get_augmented_arrays()
+        if result_image is None:
+            return None
+       
+        # Check if any items have exclude_masks set to True
+        has_excluded_masks = any(item.exclude_masks for item in self.canvas.defect_items + self.canvas.region_items)
+        # Check if any items were created in normal mode (don't exclude masks)
+        has_normal_mode_items = any(not item.exclude_masks for item in self.canvas.defect_items + self.canvas.region_items)
+       
+        # Defect and region metadata, with segmentation from their (cached) mask contours
+        defects_metadata = [item.to_metadata_dict() for item in self.canvas.defect_items]
+        regions_metadata = [item.to_metadata_dict() for item in self.canvas.region_items]
+        
+        # Extract segmentation from paint layer
+        paint_strokes = self.extract_paint_strokes_segmentation()
+        paint_strokes_metadata = []
+        for idx, stroke in enumerate(paint_strokes):
+            paint_strokes_metadata.append({
+                'label': 'paint_stroke',
+                'stroke_index': idx,
+                'bbox': stroke['bbox'],
+                'segmentation': stroke['segmentation']
+            })
+        
+        metadata = {
+            'target_image': os.path.basename(key),
+            'target_image_path': key,
+            'has_excluded_masks': has_excluded_masks,
+            'defects': defects_metadata,
+            'regions': regions_metadata,
+            'paint_strokes': paint_strokes_metadata
+        }
+       
+        # Keep the paint mask as uint8 (it is binary, so this is exact) rather than float
+        paint_mask_tensor = self.get_paint_mask_tensor()
+        paint_mask = None if paint_mask_tensor is None else paint_mask_tensor[0].mul(255).to(torch.uint8).numpy()
+       
+        # The render buffers are reused by the next render, so keep copies
+        return (
+            result_image.copy(),
+            result_mask.copy() if has_normal_mode_items else None,
+            paint_mask,
+            metadata
+        )
+   
     def save_all_augmentations(self):
         """Save all cached augmentations to a chosen folder with a base name and incremental indices."""
         if not self.augmentation_states:
@@ -2459,132 +2828,70 @@ class DefectPlacementTool(QMainWindow):
         orig_image_path = self.current_image_path
        
         num_saved = 0
-        # Iterate deterministically
-        for key in list(self.augmentation_states.keys()):
-            state = self.augmentation_states.get(key)
-            if not state or not state.get('items'):
-                continue
-            if not os.path.exists(key):
-                continue
-            # Load target image
-            self.current_image_path = key
-            resized_tensor, original_tensor = self._load_image_tensor(key)
-            self.canvas.set_background_image(resized_tensor, original_tensor)
-            # Restore this image's state
-            self.restore_state_from_cache()
-            # Render
-            result_image, result_mask = self.canvas.get_augmented_image()
-            if result_image is None:
-                continue
-           
-            # Check if any items have exclude_masks set to True
-            has_excluded_masks = any(item.exclude_masks for item in self.canvas.defect_items + self.canvas.region_items)
-            # Check if any items were created in normal mode (don't exclude masks)
-            has_normal_mode_items = any(not item.exclude_masks for item in self.canvas.defect_items + self.canvas.region_items)
-           
-            # Save files
-            img_filename = f"{base_name}_{current_idx}.png"
-            img_path = os.path.join(output_dir, img_filename)
-            image_pil = TF.to_pil_image(result_image)
-            image_pil.save(img_path)
-           
-            # Save mask only if there are items that were created in normal mode
-            if has_normal_mode_items:
-                mask_filename = f"{base_name}_{current_idx}_mask.png"
-                mask_path = os.path.join(output_dir, mask_filename)
-                mask_pil = TF.to_pil_image(result_mask)
-                mask_pil.save(mask_path)
-            
-            # Save paint mask separately if paint strokes exist
-            paint_mask_tensor = self.get_paint_mask_tensor()
-            if paint_mask_tensor is not None:
-                paint_mask_filename = f"{base_name}_{current_idx}_paint_mask.png"
-                paint_mask_path = os.path.join(output_dir, paint_mask_filename)
-                paint_mask_pil = TF.to_pil_image(paint_mask_tensor)
-                paint_mask_pil.save(paint_mask_path)
-           
-            # Save metadata
-            # Extract segmentation for defects
-            defects_metadata = []
-            for item in self.canvas.defect_items:
-                defect_meta = {
-                    'label': item.defect_data.get('type', 'unknown'),
-                    'position': item.get_position(),
-                    'scale': item.scale_factor,
-                    'rotation': item.rotation_angle,
-                    'opacity': item.opacity,
-                    'mask_path': item.defect_data.get('mask_path') if not item.exclude_masks else None,
-                    'defect_image_path': item.defect_data.get('defect_image_path') if not item.exclude_masks else None
-                }
-                
-                # Extract segmentation from mask if not excluded
-                if not item.exclude_masks and hasattr(item, 'mask_pixmap'):
-                    seg_data = self.extract_segmentation_from_mask(item.mask_pixmap, item.get_position())
-                    if seg_data:
-                        defect_meta['bbox'] = seg_data['bbox']
-                        defect_meta['segmentation'] = seg_data['segmentation']
-                
-                defects_metadata.append(defect_meta)
-            
-            # Extract segmentation for regions
-            regions_metadata = []
-            for item in self.canvas.region_items:
-                region_meta = {
-                    'label': 'selection_label',
-                    'position': item.get_position(),
-                    'scale': item.scale_factor,
-                    'rotation': item.rotation_angle,
-                    'opacity': item.opacity,
-                    'original_rect': item.region_data.get('original_rect') if not item.exclude_masks else None,
-                    'source': item.region_data.get('source', 'unknown') if not item.exclude_masks else None
-                }
-                
-                # Extract segmentation from mask if not excluded
-                if not item.exclude_masks:
-                    # Try to get segmentation from mask
-                    if hasattr(item, 'mask_pixmap'):
-                        seg_data = self.extract_segmentation_from_mask(item.mask_pixmap, item.get_position())
-                        if seg_data:
-                            region_meta['bbox'] = seg_data['bbox']
-                            region_meta['segmentation'] = seg_data['segmentation']
-                    # Fallback to freehand_points if available
-                    elif item.region_data.get('freehand_points'):
-                        region_meta['segmentation'] = [item.region_data.get('freehand_points')]
-                        if item.region_data.get('original_rect'):
-                            region_meta['bbox'] = item.region_data.get('original_rect')
-                
-                regions_metadata.append(region_meta)
+        # PNG encoding runs on worker threads (libpng releases the GIL) while the next image renders
+        # (the pool is shut down on error too, and write errors re-raise from result())
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as write_pool:
+            writes = []
+            # Iterate deterministically over the states that have something to save
+            keys = [key for key, state in self.augmentation_states.items()
+                    if state and state.get('items') and os.path.exists(key)]
+            # Only states changed since their last render need their target decoded and rendered
+            state_hashes = {key: self._state_hash(key) for key in keys}
+            stale = [key for key in keys if self._rendered_cache.get(key, (None, None))[0] != state_hashes[key]]
+            next_stale = dict(zip(stale, stale[1:]))
+            for key in keys:
+                rendered = self._rendered_cache.get(key)
+                if rendered is not None and rendered[0] == state_hashes[key]:
+                    self._rendered_cache.move_to_end(key)
+                else:
+                    # Decode the next stale target in the background while this one renders and saves
+                    next_key = next_stale.get(key)
+                    if next_key:
+                        self._prefetch_decode(next_key)
+                    outputs = self._render_state_outputs(key)
+                    if outputs is None:
+                        continue
+                    rendered = (state_hashes[key], outputs)
+                    self._rendered_cache[key] = rendered
+                    self._rendered_cache.move_to_end(key)
+                    if len(self._rendered_cache) > 16:
+                        self._rendered_cache.popitem(last=False)
+                result_image, result_mask, paint_mask, metadata = rendered[1]
+           
+                # Save files (cached outputs are never modified, so writers can share them)
+                img_filename = f"{base_name}_{current_idx}.png"
+                img_path = os.path.join(output_dir, img_filename)
+                writes.append(write_pool.submit(self._write_png, img_path, result_image))
+           
+                # Save mask only if there are items that were created in normal mode
+                if result_mask is not None:
+                    mask_filename = f"{base_name}_{current_idx}_mask.png"
+                    mask_path = os.path.join(output_dir, mask_filename)
+                    writes.append(write_pool.submit(self._write_png, mask_path, result_mask))
             
-            # Extract segmentation from paint layer
-            paint_strokes = self.extract_paint_strokes_segmentation()
-            paint_strokes_metadata = []
-            for idx, stroke in enumerate(paint_strokes):
-                paint_strokes_metadata.append({
-                    'label': 'paint_stroke',
-                    'stroke_index': idx,
-                    'bbox': stroke['bbox'],
-                    'segmentation': stroke['segmentation']
-                })
-            
-            metadata = {
-                'target_image': os.path.basename(key),
-                'target_image_path': key,
-                'has_excluded_masks': has_excluded_masks,
-                'defects': defects_metadata,
-                'regions': regions_metadata,
-                'paint_strokes': paint_strokes_metadata
-            }
-            meta_path = os.path.join(output_dir, f"{base_name}_{current_idx}_metadata.json")
-            with open(meta_path, 'w') as f:
-                json.dump(metadata, f, indent=2)
-            current_idx += 1
-            num_saved += 1
+                # Save paint mask separately if paint strokes exist
+                if paint_mask is not None:
+                    paint_mask_filename = f"{base_name}_{current_idx}_paint_mask.png"
+                    paint_mask_path = os.path.join(output_dir, paint_mask_filename)
+                    writes.append(write_pool.submit(self._write_png, paint_mask_path, paint_mask))
+           
+                # Save metadata
+                meta_path = os.path.join(output_dir, f"{base_name}_{current_idx}_metadata.json")
+                with open(meta_path, 'w') as f:
+                    json.dump(metadata, f, indent=2)
+                current_idx += 1
+                num_saved += 1
+           
+            # Wait for the pending image writes, re-raising any write error
+            for future in writes:
+                future.result()
+        self._next_index_cache[(output_dir, base_name)] = current_idx
        
         # Restore original context
         if orig_image_path is not None:
             self.current_image_path = orig_image_path
-            image_tensor = self._load_image_tensor(orig_image_path)
-            self.canvas.set_background_image(image_tensor)
+            resized_tensor, original_tensor = self._load_image_tensor_cached(orig_image_path)
+            self.canvas.set_background_image(resized_tensor, original_tensor)
             self.restore_state_from_cache()
        
         if num_saved == 0:
@@ -2720,6 +3027,11 @@ class DefectPlacementTool(QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
+            # Drop queued library conversions so exit does not wait on them
+            for future in list(self.defect_prebuild_futures.values()) + list(self._decode_futures.values()):
+                future.cancel()
+            self.defect_prebuild_pool.shutdown(wait=False)
+            self._decode_pool.shutdown(wait=False)
             event.accept()
         else:
             event.ignore()